@@ -0,0 +1,30 @@
+"""
+_build_template.py  --  build the pre-seeded vault shipped with releases
+
+    python _build_template.py
+
+Writes vault.template.db next to this file. db_init.init_db() copies it into
+place on first run instead of seeding the starter library at runtime.
+"""
+
+import os
+import sqlite3
+
+import db_init
+
+
+def build() -> None:
+    path = db_init.TEMPLATE_DB_PATH
+    if os.path.exists(path):
+        os.remove(path)
+    db_init.seed_db(path)
+
+    con = sqlite3.connect(path)
+    count = con.execute("SELECT COUNT(*) FROM commands").fetchone()[0]
+    con.close()
+    print(f"Template ready: {path}")
+    print(f"Commands loaded: {count}")
+
+
+if __name__ == "__main__":
+    build()
@@ -6,437 +6,352 @@ Run this once (or to reset to defaults):
 
 It creates vault.db in the same directory with:
   - Full schema (FTS5 index + triggers)
-  - Starter library: Cisco, Linux, Proxmox, Ansible
+  - Starter library from seed.json: Cisco, Linux, Proxmox, Ansible
+
+Release builds ship vault.template.db (see _build_template.py); when it is
+present a fresh vault is copied from it instead of being seeded.
 """
 
 import os
-import sqlite3
-
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vault.db")
-
-
+import sys
+from typing import TYPE_CHECKING
+
+# sqlite3, json, shutil etc. are imported inside the functions that use
+# them, so importing this module for its paths and SQL constants (as
+# main.py and manager.py do on every start) stays cheap.
+if TYPE_CHECKING:
+    import sqlite3
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(PLUGIN_DIR, "vault.db")
+# Pre-built copy of the starter vault, produced by _build_template.py at
+# release time.
+TEMPLATE_DB_PATH = os.path.join(PLUGIN_DIR, "vault.template.db")
+# Starter library: category -> subcategory -> [title, command, description,
+# tags, is_favorite] rows.
+SEED_PATH = os.path.join(PLUGIN_DIR, "seed.json")
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER is 999 on older builds.
+_MAX_PARAMS = 999
+
+
+# Connection PRAGMAs are issued from _load(): the seed load runs with a
+# throwaway journal, then the file is switched to WAL for the runtime app.
 SCHEMA = """
-PRAGMA journal_mode=WAL;
-
 CREATE TABLE IF NOT EXISTS commands (
-  id          INTEGER PRIMARY KEY AUTOINCREMENT,
+  id          INTEGER PRIMARY KEY,
   category    TEXT    NOT NULL,
   subcategory TEXT,
   title       TEXT    NOT NULL,
   command     TEXT    NOT NULL,
   description TEXT,
   tags        TEXT,
-  is_favorite INTEGER NOT NULL DEFAULT 0,
+  is_favorite INTEGER NOT NULL DEFAULT 0 CHECK (is_favorite IN (0, 1)),
   created_at  TEXT    NOT NULL DEFAULT (datetime('now')),
   updated_at  TEXT    NOT NULL DEFAULT (datetime('now'))
 );
-
-CREATE INDEX IF NOT EXISTS idx_cmd_category ON commands(category);
-CREATE INDEX IF NOT EXISTS idx_cmd_title    ON commands(title);
-
+"""
+# Natural key: re-running the initializer skips seed rows that already exist
+# (INSERT OR IGNORE) instead of duplicating them. A UNIQUE index treats NULLs
+# as distinct, and the seed stores "no subcategory" as NULL while the manager
+# stores "", so the key folds both to "".
+NATKEY_INDEX = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_cmd_natkey "
+    "ON commands(category, ifnull(subcategory, ''), title)"
+)
+
+# Split once at import; the statements run inside the seed transaction.
+SCHEMA_STMTS = tuple(s.strip() for s in SCHEMA.split(";") if s.strip())
+
+# Bumped whenever INDEXES / the FTS schema change. Stored in PRAGMA
+# user_version; main.py and manager.py only call migrate() when a vault is
+# behind, so connecting doesn't issue DDL every time.
+SCHEMA_VERSION = 1
+
+# Typed % and _ are literal characters, not LIKE wildcards. Shared by the
+# plugin's and the manager's LIKE searches.
+LIKE_ESCAPE = str.maketrans({"\\": "\\\\", "%": "\\%", "_": "\\_"})
+LIKE_ESCAPE_SQL = " ESCAPE '\\'"
+
+# Built after the seed rows are loaded rather than maintained row by row.
+# Title lookups go through commands_fts, so there is no btree on title.
+# idx_cmds_order matches the search ORDER BY, so a LIMIT 50 scan can stop
+# early instead of sorting every match. idx_cmd_cat_fav covers the manager's
+# per-category / favorites counts without touching the table.
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_cmd_cat_fav ON commands(category, is_favorite)",
+    "CREATE INDEX IF NOT EXISTS idx_cmds_order "
+    "ON commands(is_favorite DESC, category, subcategory, title)",
+    # Lets case-insensitive prefix LIKEs on category/subcategory use a range scan
+    "CREATE INDEX IF NOT EXISTS idx_cmd_category_nc "
+    "ON commands(category COLLATE NOCASE, subcategory COLLATE NOCASE)",
+)
+
+# The FTS index and its sync triggers are created after the seed rows are in
+# place, so the index is built in one pass instead of once per INSERT.
+FTS_SCHEMA = """
 CREATE VIRTUAL TABLE IF NOT EXISTS commands_fts USING fts5(
   title, command, description, tags, category, subcategory,
   content='commands', content_rowid='id'
-);
+)
+"""
 
+# commands_au only fires for indexed columns, so toggling is_favorite or
+# bumping updated_at doesn't re-tokenize the row.
+FTS_TRIGGERS = (
+    """
 CREATE TRIGGER IF NOT EXISTS commands_ai AFTER INSERT ON commands BEGIN
   INSERT INTO commands_fts(rowid, title, command, description, tags, category, subcategory)
   VALUES (new.id, new.title, new.command, new.description, new.tags, new.category, new.subcategory);
-END;
-
+END
+""",
+    """
 CREATE TRIGGER IF NOT EXISTS commands_ad AFTER DELETE ON commands BEGIN
   INSERT INTO commands_fts(commands_fts, rowid, title, command, description, tags, category, subcategory)
   VALUES ('delete', old.id, old.title, old.command, old.description, old.tags, old.category, old.subcategory);
-END;
-
-CREATE TRIGGER IF NOT EXISTS commands_au AFTER UPDATE ON commands BEGIN
+END
+""",
+    """
+CREATE TRIGGER IF NOT EXISTS commands_au
+AFTER UPDATE OF title, command, description, tags, category, subcategory ON commands BEGIN
   INSERT INTO commands_fts(commands_fts, rowid, title, command, description, tags, category, subcategory)
   VALUES ('delete', old.id, old.title, old.command, old.description, old.tags, old.category, old.subcategory);
   INSERT INTO commands_fts(rowid, title, command, description, tags, category, subcategory)
   VALUES (new.id, new.title, new.command, new.description, new.tags, new.category, new.subcategory);
-END;
-"""
+END
+""",
+)
+
+
+def load_seed() -> dict:
+    """Read the starter library from seed.json."""
+    import json
+
+    with open(SEED_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _seed_rows(seed: dict, now: str):
+    """Flatten the seed mapping into (category, subcategory, title, ...) insert rows."""
+    for cat, subs in seed.items():
+        cat_i = sys.intern(cat)
+        for sub, rows in subs.items():
+            sub_i = sys.intern(sub) if sub else None
+            for row in rows:
+                yield (cat_i, sub_i, *row, now, now)
+
+
+def _insert_rows(cur: "sqlite3.Cursor", rows) -> None:
+    """Insert seed rows using multi-row VALUES, chunked to the parameter limit."""
+    import itertools
+
+    ncols = len(rows[0]) if rows else 0
+    if not ncols:
+        return
+    chunk_size = min(len(rows), _MAX_PARAMS // ncols)
+    row_ph = "(" + ",".join("?" * ncols) + ")"
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cur.execute(
+            "INSERT OR IGNORE INTO commands(category, subcategory, title, command, description, tags, is_favorite, "
+            "created_at, updated_at) "
+            "VALUES " + ",".join([row_ph] * len(chunk)),
+            list(itertools.chain.from_iterable(chunk)),
+        )
+
+
+def _insert_missing_rows(cur: "sqlite3.Cursor", rows) -> None:
+    """Insert only seed rows whose natural key isn't present yet.
+
+    Used when ux_cmd_natkey can't be built, where INSERT OR IGNORE would
+    have nothing to conflict with.
+    """
+    cur.executemany(
+        "INSERT INTO commands(category, subcategory, title, command, description, tags, is_favorite, "
+        "created_at, updated_at) "
+        "SELECT ?, ?, ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS ("
+        "SELECT 1 FROM commands WHERE category = ? AND ifnull(subcategory, '') = ifnull(?, '') "
+        "AND title = ?)",
+        (row + row[:3] for row in rows),
+    )
 
-# (category, subcategory, title, command, description, tags, is_favorite)
-SEED_DATA = [
-    # ---- Cisco / VLAN --------------------------------------------------------
-    ("Cisco", "VLAN", "Show VLAN brief", "show vlan brief",
-     "List all VLANs with port assignments", "vlan,l2,ccna", 1),
-    ("Cisco", "VLAN", "Show VLAN detail", "show vlan id {vlan_id}",
-     "Detail for a specific VLAN ID", "vlan,l2", 0),
-    ("Cisco", "VLAN", "Create VLAN", "vlan {vlan_id}\n name {vlan_name}",
-     "Create VLAN and assign name", "vlan,config", 0),
-    ("Cisco", "VLAN", "Delete VLAN", "no vlan {vlan_id}",
-     "Remove a VLAN from VTP database", "vlan,config", 0),
-    ("Cisco", "VLAN", "Show interfaces trunk", "show interfaces trunk",
-     "Show all trunk ports and allowed VLANs", "vlan,trunk,l2", 1),
-    ("Cisco", "VLAN", "Show VLAN on interface", "show interfaces {iface} trunk",
-     "Trunk info for a specific interface", "vlan,trunk", 0),
-    ("Cisco", "VLAN", "Set interface access VLAN", "interface {iface}\n switchport mode access\n switchport access vlan {vlan_id}",
-     "Assign interface to VLAN in access mode", "vlan,config,l2", 0),
-    ("Cisco", "VLAN", "Add VLAN to trunk", "interface {iface}\n switchport trunk allowed vlan add {vlan_id}",
-     "Allow additional VLAN on trunk port", "vlan,trunk,config", 0),
-
-    # ---- Cisco / MAC ---------------------------------------------------------
-    ("Cisco", "MAC", "Show MAC address table", "show mac address-table",
-     "Full MAC address table", "mac,l2,ccna", 1),
-    ("Cisco", "MAC", "Show MAC on interface", "show mac address-table interface {iface}",
-     "MACs learned on a specific port", "mac,l2", 0),
-    ("Cisco", "MAC", "Show MAC for VLAN", "show mac address-table vlan {vlan_id}",
-     "MACs in a specific VLAN", "mac,vlan,l2", 0),
-    ("Cisco", "MAC", "Show MAC dynamic count", "show mac address-table count",
-     "Count of dynamic MAC entries", "mac,l2", 0),
-    ("Cisco", "MAC", "Clear MAC table", "clear mac address-table dynamic",
-     "Flush all dynamic MAC entries", "mac,l2,clear", 0),
-
-    # ---- Cisco / ARP ---------------------------------------------------------
-    ("Cisco", "ARP", "Show ARP table", "show ip arp",
-     "Full ARP table", "arp,l3,ccna", 1),
-    ("Cisco", "ARP", "Show ARP for interface", "show ip arp {iface}",
-     "ARP entries on specific interface", "arp,l3", 0),
-    ("Cisco", "ARP", "Show ARP for IP", "show ip arp {ip}",
-     "ARP entry for a specific IP", "arp,l3", 0),
-    ("Cisco", "ARP", "Clear ARP cache", "clear arp-cache",
-     "Flush ARP table", "arp,l3,clear", 0),
-
-    # ---- Cisco / Interfaces --------------------------------------------------
-    ("Cisco", "Interfaces", "Show interfaces", "show interfaces",
-     "All interface statistics", "interface,l1,ccna", 1),
-    ("Cisco", "Interfaces", "Show interface status", "show interfaces status",
-     "Port status summary (speed, duplex, VLAN)", "interface,l1,ccna", 1),
-    ("Cisco", "Interfaces", "Show interface description", "show interfaces description",
-     "Interface descriptions and state", "interface,l1", 0),
-    ("Cisco", "Interfaces", "Show specific interface", "show interfaces {iface}",
-     "Full detail for one interface", "interface,l1", 0),
-    ("Cisco", "Interfaces", "Show interface counters", "show interfaces {iface} counters",
-     "Traffic counters for an interface", "interface,l1,counters", 0),
-    ("Cisco", "Interfaces", "Show CDP neighbors", "show cdp neighbors detail",
-     "Neighbors with IP, platform, interface", "cdp,topology,ccna", 1),
-    ("Cisco", "Interfaces", "Shutdown interface", "interface {iface}\n shutdown",
-     "Administratively disable a port", "interface,config", 0),
-    ("Cisco", "Interfaces", "No shutdown interface", "interface {iface}\n no shutdown",
-     "Bring up a disabled port", "interface,config", 0),
-
-    # ---- Cisco / Routing -----------------------------------------------------
-    ("Cisco", "Routing", "Show IP route", "show ip route",
-     "Full routing table", "routing,l3,ccna", 1),
-    ("Cisco", "Routing", "Show IP route summary", "show ip route summary",
-     "Route count per protocol", "routing,l3", 0),
-    ("Cisco", "Routing", "Show IP route for prefix", "show ip route {prefix}",
-     "Route lookup for a specific prefix", "routing,l3", 0),
-    ("Cisco", "Routing", "Add static route", "ip route {prefix} {mask} {next_hop}",
-     "Configure a static route", "routing,config", 0),
-    ("Cisco", "Routing", "Show OSPF neighbors", "show ip ospf neighbor",
-     "OSPF adjacency table", "ospf,routing,l3", 0),
-    ("Cisco", "Routing", "Show OSPF database", "show ip ospf database",
-     "OSPF LSDB summary", "ospf,routing", 0),
-    ("Cisco", "Routing", "Show BGP summary", "show ip bgp summary",
-     "BGP neighbor table", "bgp,routing,l3", 0),
-
-    # ---- Cisco / STP ---------------------------------------------------------
-    ("Cisco", "STP", "Show spanning-tree", "show spanning-tree",
-     "STP state for all VLANs", "stp,l2,ccna", 1),
-    ("Cisco", "STP", "Show STP for VLAN", "show spanning-tree vlan {vlan_id}",
-     "STP topology for a specific VLAN", "stp,l2,vlan", 0),
-    ("Cisco", "STP", "Show STP root", "show spanning-tree root",
-     "Root bridge per VLAN", "stp,l2", 0),
-    ("Cisco", "STP", "Show STP blocklist", "show spanning-tree blockedports",
-     "Ports in BLK state", "stp,l2", 0),
-    ("Cisco", "STP", "Set STP root primary", "spanning-tree vlan {vlan_id} root primary",
-     "Force this switch as root for VLAN", "stp,config", 0),
-
-    # ---- Cisco / Port-Channel ------------------------------------------------
-    ("Cisco", "Port-Channel", "Show etherchannel summary", "show etherchannel summary",
-     "Port-Channel status (LACP/PAgP)", "portchannel,lacp,l2", 1),
-    ("Cisco", "Port-Channel", "Show etherchannel detail", "show etherchannel {pc_num} detail",
-     "Detailed Port-Channel info", "portchannel,lacp", 0),
-    ("Cisco", "Port-Channel", "Create LACP Port-Channel", "interface range {iface_range}\n channel-group {pc_num} mode active",
-     "Bundle interfaces in LACP active mode", "portchannel,lacp,config", 0),
-
-    # ---- Cisco / ACL ---------------------------------------------------------
-    ("Cisco", "ACL", "Show access-lists", "show access-lists",
-     "All configured ACLs with hit counts", "acl,security", 1),
-    ("Cisco", "ACL", "Show specific ACL", "show access-lists {acl_name}",
-     "Specific ACL entries and counters", "acl,security", 0),
-    ("Cisco", "ACL", "Show interface ACL", "show ip interface {iface}",
-     "ACL applied to an interface", "acl,interface,security", 0),
-
-    # ---- Cisco / NAT ---------------------------------------------------------
-    ("Cisco", "NAT", "Show NAT translations", "show ip nat translations",
-     "Active NAT sessions", "nat,l3", 1),
-    ("Cisco", "NAT", "Show NAT statistics", "show ip nat statistics",
-     "NAT hit/miss counters", "nat,l3", 0),
-    ("Cisco", "NAT", "Clear NAT translations", "clear ip nat translation *",
-     "Flush all dynamic NAT entries", "nat,clear", 0),
-
-    # ---- Cisco / System ------------------------------------------------------
-    ("Cisco", "System", "Show version", "show version",
-     "IOS version, uptime, flash, RAM", "system,ccna", 1),
-    ("Cisco", "System", "Show running-config", "show running-config",
-     "Current active configuration", "config,system", 1),
-    ("Cisco", "System", "Show startup-config", "show startup-config",
-     "Saved configuration in NVRAM", "config,system", 0),
-    ("Cisco", "System", "Copy run to startup", "copy running-config startup-config",
-     "Save configuration", "config,save,ccna", 1),
-    ("Cisco", "System", "Show flash", "show flash:",
-     "Flash filesystem contents", "system,flash", 0),
-    ("Cisco", "System", "Show CPU", "show processes cpu sorted",
-     "CPU utilization per process", "system,performance", 0),
-    ("Cisco", "System", "Show memory", "show processes memory sorted",
-     "Memory usage per process", "system,performance", 0),
-    ("Cisco", "System", "Show log", "show logging",
-     "System log buffer", "system,logs,ccna", 1),
-    ("Cisco", "System", "Show NTP status", "show ntp status",
-     "NTP synchronization state", "system,ntp,time", 0),
-    ("Cisco", "System", "Ping", "ping {target}",
-     "ICMP ping to a host", "ping,connectivity", 1),
-    ("Cisco", "System", "Traceroute", "traceroute {target}",
-     "Trace hops to a destination", "trace,connectivity", 0),
-    ("Cisco", "System", "Reload", "reload",
-     "Restart the device", "system,reload", 0),
-
-    # ---- Linux / Disk --------------------------------------------------------
-    ("Linux", "Disk", "Disk usage (human)", "df -h",
-     "Filesystem usage in human-readable format", "disk,storage", 1),
-    ("Linux", "Disk", "Disk usage inode", "df -i",
-     "Inode usage per filesystem", "disk,inode", 0),
-    ("Linux", "Disk", "Directory size", "du -sh {path}",
-     "Size of a directory", "disk,storage", 0),
-    ("Linux", "Disk", "Top 10 largest dirs", "du -h --max-depth=1 {path} | sort -rh | head -10",
-     "Find largest subdirectories", "disk,storage,find", 0),
-    ("Linux", "Disk", "List block devices", "lsblk -o NAME,SIZE,TYPE,MOUNTPOINT,FSTYPE",
-     "Block device tree with filesystem info", "disk,block", 0),
-    ("Linux", "Disk", "Disk I/O stats", "iostat -xz 1 5",
-     "I/O utilization per device", "disk,performance,io", 0),
-
-    # ---- Linux / Network -----------------------------------------------------
-    ("Linux", "Network", "Show IP addresses", "ip a",
-     "All network interfaces and IPs", "network,ip,linux", 1),
-    ("Linux", "Network", "Show routing table", "ip route show",
-     "Kernel routing table", "network,routing,linux", 1),
-    ("Linux", "Network", "Show connections", "ss -tulnp",
-     "Listening sockets with PID", "network,sockets,linux", 1),
-    ("Linux", "Network", "Ping host", "ping -c 4 {host}",
-     "ICMP test, 4 packets", "network,ping", 0),
-    ("Linux", "Network", "Traceroute", "traceroute {host}",
-     "Trace network path to host", "network,trace", 0),
-    ("Linux", "Network", "DNS lookup", "dig {domain}",
-     "DNS query for a domain", "network,dns", 0),
-    ("Linux", "Network", "Reverse DNS", "dig -x {ip}",
-     "PTR record for an IP", "network,dns", 0),
-    ("Linux", "Network", "Curl HTTP status", "curl -o /dev/null -s -w '%{http_code}' {url}",
-     "Get HTTP status code of a URL", "network,http,curl", 0),
-    ("Linux", "Network", "Network interface stats", "ip -s link show {iface}",
-     "TX/RX counters for an interface", "network,counters", 0),
-    ("Linux", "Network", "Flush ARP cache", "ip neigh flush all",
-     "Clear ARP/neighbor table", "network,arp,clear", 0),
-
-    # ---- Linux / System ------------------------------------------------------
-    ("Linux", "System", "System uptime", "uptime",
-     "Load averages and uptime", "system,performance", 1),
-    ("Linux", "System", "CPU info", "lscpu",
-     "Processor architecture and core count", "system,cpu", 0),
-    ("Linux", "System", "Memory usage", "free -h",
-     "RAM and swap usage", "system,memory,performance", 1),
-    ("Linux", "System", "Process list (top)", "top -bn1 | head -20",
-     "Snapshot of running processes", "system,process", 0),
-    ("Linux", "System", "Process list (htop)", "htop",
-     "Interactive process manager", "system,process", 0),
-    ("Linux", "System", "Kill process by name", "pkill -f {process_name}",
-     "Kill process matching a name pattern", "system,process", 0),
-    ("Linux", "System", "Find process by port", "ss -tulnp | grep :{port}",
-     "Find which process listens on a port", "network,process,port", 1),
-    ("Linux", "System", "Kernel version", "uname -r",
-     "Current kernel version", "system,kernel", 0),
-    ("Linux", "System", "OS release", "cat /etc/os-release",
-     "Distribution and version info", "system,os", 0),
-    ("Linux", "System", "Last logins", "last -n 20",
-     "Recent login history", "system,security,auth", 0),
-    ("Linux", "System", "Failed SSH logins", "grep 'Failed password' /var/log/auth.log | tail -20",
-     "Recent failed SSH attempts", "system,security,ssh", 0),
-    ("Linux", "System", "Journal errors", "journalctl -p err -n 50 --no-pager",
-     "Last 50 error-level journal entries", "system,logs", 1),
-    ("Linux", "System", "Systemctl service status", "systemctl status {service}",
-     "Status of a systemd service", "system,service,systemd", 1),
-    ("Linux", "System", "Restart service", "systemctl restart {service}",
-     "Restart a systemd service", "system,service,systemd", 0),
-    ("Linux", "System", "Enable service", "systemctl enable --now {service}",
-     "Enable and start a service", "system,service,systemd", 0),
-    ("Linux", "System", "List failed services", "systemctl --failed",
-     "Show all failed systemd units", "system,service,systemd", 1),
-
-    # ---- Linux / Files -------------------------------------------------------
-    ("Linux", "Files", "Find file by name", "find {path} -name '{filename}'",
-     "Recursive file search by name", "files,find", 0),
-    ("Linux", "Files", "Find large files", "find {path} -type f -size +{size}M -exec ls -lh {} \\; | sort -k5 -rh | head -20",
-     "Find files larger than N MB", "files,disk,find", 0),
-    ("Linux", "Files", "Search in files", "grep -rn '{pattern}' {path}",
-     "Recursive text search", "files,grep,search", 0),
-    ("Linux", "Files", "Tail log", "tail -f {logfile}",
-     "Follow a log file in real time", "files,logs", 1),
-    ("Linux", "Files", "Archive directory", "tar -czf {archive}.tar.gz {directory}",
-     "Compress a directory", "files,archive", 0),
-    ("Linux", "Files", "Extract archive", "tar -xzf {archive}.tar.gz -C {destination}",
-     "Extract a .tar.gz archive", "files,archive", 0),
-
-    # ---- Linux / SSH ---------------------------------------------------------
-    ("Linux", "SSH", "SSH to host", "ssh {user}@{host}",
-     "Open SSH session", "ssh,remote", 1),
-    ("Linux", "SSH", "SSH with key", "ssh -i {key_path} {user}@{host}",
-     "SSH with a specific private key", "ssh,remote,key", 0),
-    ("Linux", "SSH", "SCP file to remote", "scp {local_file} {user}@{host}:{remote_path}",
-     "Copy file to remote host", "ssh,scp,transfer", 0),
-    ("Linux", "SSH", "SCP file from remote", "scp {user}@{host}:{remote_file} {local_path}",
-     "Copy file from remote host", "ssh,scp,transfer", 0),
-    ("Linux", "SSH", "SSH tunnel (local)", "ssh -L {local_port}:{remote_host}:{remote_port} {user}@{jump_host}",
-     "Local port forward via SSH", "ssh,tunnel,network", 0),
-
-    # ---- Proxmox -------------------------------------------------------------
-    ("Proxmox", "VM", "List all VMs", "qm list",
-     "All virtual machines and status", "proxmox,vm,qemu", 1),
-    ("Proxmox", "VM", "VM status", "qm status {vmid}",
-     "Status of a specific VM", "proxmox,vm", 0),
-    ("Proxmox", "VM", "Start VM", "qm start {vmid}",
-     "Start a virtual machine", "proxmox,vm,start", 0),
-    ("Proxmox", "VM", "Stop VM (graceful)", "qm shutdown {vmid}",
-     "Graceful shutdown via ACPI", "proxmox,vm,stop", 0),
-    ("Proxmox", "VM", "Stop VM (force)", "qm stop {vmid}",
-     "Force stop a VM immediately", "proxmox,vm,stop", 0),
-    ("Proxmox", "VM", "Reset VM", "qm reset {vmid}",
-     "Hard reset a VM", "proxmox,vm", 0),
-    ("Proxmox", "VM", "VM config", "qm config {vmid}",
-     "Show VM configuration", "proxmox,vm,config", 0),
-    ("Proxmox", "VM", "VM monitor command", "qm monitor {vmid}",
-     "Open QEMU monitor for a VM", "proxmox,vm,debug", 0),
-    ("Proxmox", "VM", "Clone VM", "qm clone {vmid} {newid} --name {name} --full",
-     "Full clone of a VM", "proxmox,vm,clone", 0),
-    ("Proxmox", "VM", "Create VM snapshot", "qm snapshot {vmid} {snapname}",
-     "Create a named snapshot", "proxmox,vm,snapshot,backup", 1),
-    ("Proxmox", "VM", "Rollback snapshot", "qm rollback {vmid} {snapname}",
-     "Restore VM to a snapshot", "proxmox,vm,snapshot,restore", 0),
-    ("Proxmox", "VM", "Delete snapshot", "qm delsnapshot {vmid} {snapname}",
-     "Remove a VM snapshot", "proxmox,vm,snapshot", 0),
-    ("Proxmox", "VM", "Destroy VM", "qm destroy {vmid} --purge",
-     "Delete VM and all disks", "proxmox,vm,delete", 0),
-
-    # ---- Proxmox / Container -------------------------------------------------
-    ("Proxmox", "Container", "List all containers", "pct list",
-     "All LXC containers and state", "proxmox,lxc,container", 1),
-    ("Proxmox", "Container", "Container status", "pct status {ctid}",
-     "Status of a specific container", "proxmox,lxc", 0),
-    ("Proxmox", "Container", "Start container", "pct start {ctid}",
-     "Start an LXC container", "proxmox,lxc,start", 0),
-    ("Proxmox", "Container", "Stop container", "pct stop {ctid}",
-     "Stop an LXC container", "proxmox,lxc,stop", 0),
-    ("Proxmox", "Container", "Container config", "pct config {ctid}",
-     "Show container configuration", "proxmox,lxc,config", 0),
-    ("Proxmox", "Container", "Enter container", "pct enter {ctid}",
-     "Shell into a running container", "proxmox,lxc,shell", 1),
-
-    # ---- Proxmox / Storage ---------------------------------------------------
-    ("Proxmox", "Storage", "List storages", "pvesm status",
-     "All storage pools and usage", "proxmox,storage", 1),
-    ("Proxmox", "Storage", "List storage content", "pvesm list {storage}",
-     "Content of a specific storage", "proxmox,storage", 0),
-    ("Proxmox", "Storage", "Ceph status", "ceph status",
-     "Ceph cluster health and PG status", "proxmox,ceph,storage", 1),
-    ("Proxmox", "Storage", "Ceph OSD tree", "ceph osd tree",
-     "OSD hierarchy and status", "proxmox,ceph,osd", 0),
-    ("Proxmox", "Storage", "Ceph OSD usage", "ceph osd df",
-     "Per-OSD disk usage", "proxmox,ceph,storage", 0),
-    ("Proxmox", "Storage", "Ceph pool stats", "ceph df",
-     "Pool usage statistics", "proxmox,ceph,storage", 0),
-    ("Proxmox", "Storage", "Ceph health detail", "ceph health detail",
-     "Detailed health warning info", "proxmox,ceph,health", 1),
-
-    # ---- Proxmox / Cluster ---------------------------------------------------
-    ("Proxmox", "Cluster", "Cluster status", "pvecm status",
-     "Cluster quorum and node state", "proxmox,cluster,ha", 1),
-    ("Proxmox", "Cluster", "Node list", "pvecm nodes",
-     "All cluster nodes", "proxmox,cluster", 0),
-    ("Proxmox", "Cluster", "HA status", "ha-manager status",
-     "High availability group and resource state", "proxmox,ha,cluster", 1),
-    ("Proxmox", "Cluster", "Cluster tasks", "pvesr list",
-     "Replication jobs status", "proxmox,cluster,replication", 0),
-
-    # ---- Proxmox / Backup ----------------------------------------------------
-    ("Proxmox", "Backup", "List backups", "pvesm list {storage} --content backup",
-     "All backups in a storage", "proxmox,backup", 1),
-    ("Proxmox", "Backup", "Backup VM now", "vzdump {vmid} --storage {storage} --mode snapshot",
-     "Immediate VM backup (snapshot mode)", "proxmox,backup,vm", 0),
-    ("Proxmox", "Backup", "Backup container now", "vzdump {ctid} --storage {storage} --mode snapshot",
-     "Immediate container backup", "proxmox,backup,lxc", 0),
-
-    # ---- Ansible -------------------------------------------------------------
-    ("Ansible", "Playbook", "Run playbook", "ansible-playbook {playbook}.yml -i {inventory}",
-     "Execute a playbook against an inventory", "ansible,playbook", 1),
-    ("Ansible", "Playbook", "Run playbook (verbose)", "ansible-playbook {playbook}.yml -i {inventory} -vvv",
-     "Playbook with full debug output", "ansible,playbook,debug", 0),
-    ("Ansible", "Playbook", "Run playbook (check)", "ansible-playbook {playbook}.yml -i {inventory} --check",
-     "Dry run - no changes applied", "ansible,playbook,dryrun", 1),
-    ("Ansible", "Playbook", "Run playbook (diff)", "ansible-playbook {playbook}.yml -i {inventory} --diff",
-     "Show what would change", "ansible,playbook,diff", 0),
-    ("Ansible", "Playbook", "Limit to host", "ansible-playbook {playbook}.yml -i {inventory} --limit {host}",
-     "Run playbook on a single host", "ansible,playbook,limit", 0),
-    ("Ansible", "Playbook", "Run specific tag", "ansible-playbook {playbook}.yml -i {inventory} --tags {tag}",
-     "Only tasks with a specific tag", "ansible,playbook,tag", 0),
-    ("Ansible", "Playbook", "Skip tag", "ansible-playbook {playbook}.yml -i {inventory} --skip-tags {tag}",
-     "Skip tasks with a specific tag", "ansible,playbook,tag", 0),
-
-    # ---- Ansible / Ad-hoc ----------------------------------------------------
-    ("Ansible", "Ad-hoc", "Ping all hosts", "ansible all -i {inventory} -m ping",
-     "Connectivity test for all hosts", "ansible,adhoc,ping", 1),
-    ("Ansible", "Ad-hoc", "Run shell command", "ansible {host_group} -i {inventory} -m shell -a '{command}'",
-     "Run arbitrary shell command on hosts", "ansible,adhoc,shell", 0),
-    ("Ansible", "Ad-hoc", "Copy file", "ansible {host_group} -i {inventory} -m copy -a 'src={src} dest={dest}'",
-     "Push a file to remote hosts", "ansible,adhoc,copy", 0),
-    ("Ansible", "Ad-hoc", "Gather facts", "ansible {host} -i {inventory} -m gather_facts",
-     "Collect host facts", "ansible,adhoc,facts", 0),
-    ("Ansible", "Ad-hoc", "Service restart", "ansible {host_group} -i {inventory} -m service -a 'name={service} state=restarted'",
-     "Restart a service via ad-hoc", "ansible,adhoc,service", 0),
-
-    # ---- Ansible / Inventory -------------------------------------------------
-    ("Ansible", "Inventory", "List all hosts", "ansible all -i {inventory} --list-hosts",
-     "Print all hosts in inventory", "ansible,inventory", 1),
-    ("Ansible", "Inventory", "List group hosts", "ansible {group} -i {inventory} --list-hosts",
-     "Print hosts in a specific group", "ansible,inventory", 0),
-    ("Ansible", "Inventory", "Inventory graph", "ansible-inventory -i {inventory} --graph",
-     "Visual tree of inventory groups", "ansible,inventory", 0),
-    ("Ansible", "Inventory", "Host variables", "ansible-inventory -i {inventory} --host {host}",
-     "All variables for a specific host", "ansible,inventory,vars", 0),
-
-    # ---- Ansible / Galaxy / Vault --------------------------------------------
-    ("Ansible", "Galaxy", "Install role", "ansible-galaxy install {role}",
-     "Install a role from Ansible Galaxy", "ansible,galaxy,role", 0),
-    ("Ansible", "Galaxy", "Install requirements", "ansible-galaxy install -r requirements.yml",
-     "Install all roles from requirements file", "ansible,galaxy,role", 1),
-    ("Ansible", "Vault", "Encrypt file", "ansible-vault encrypt {file}",
-     "Encrypt a file with Ansible Vault", "ansible,vault,security", 0),
-    ("Ansible", "Vault", "Decrypt file", "ansible-vault decrypt {file}",
-     "Decrypt a Vault-encrypted file", "ansible,vault,security", 0),
-    ("Ansible", "Vault", "Edit encrypted file", "ansible-vault edit {file}",
-     "Edit an encrypted Vault file in-place", "ansible,vault,security", 0),
-    ("Ansible", "Vault", "View encrypted file", "ansible-vault view {file}",
-     "View (without editing) Vault file", "ansible,vault,security", 0),
-]
 
+def _load(con: "sqlite3.Connection", fresh: bool) -> None:
+    """Create the schema on *con* and load the built-in library into it."""
+    import sqlite3
+    import time
+
+    # page_size only takes effect while the file is still empty, so it has to
+    # precede the schema; the 64 MB cache keeps the whole load in memory.
+    con.execute("PRAGMA page_size=8192")
+    con.execute("PRAGMA cache_size=-65536")
+    con.execute("PRAGMA temp_store=MEMORY")
+    if fresh:
+        # A crash while building the in-memory vault just means re-running
+        # the initializer, so skip journaling and fsyncs for the load.
+        con.execute("PRAGMA journal_mode=MEMORY")
+        con.execute("PRAGMA synchronous=OFF")
+    else:
+        # Merging into a live vault that may hold user commands and be open
+        # in the plugin or manager: keep it in WAL with a real journal, and
+        # wait for their write locks instead of failing.
+        con.execute("PRAGMA busy_timeout=5000")
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+
+    # Manage the seed transaction ourselves: one BEGIN/COMMIT around the
+    # schema and all rows.
+    con.isolation_level = None
+    cur = con.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        for stmt in SCHEMA_STMTS:
+            cur.execute(stmt)
+        # Older vaults have ux_cmd_natkey on the raw subcategory, which lets
+        # NULL-subcategory rows repeat; replace it with the ifnull() key.
+        old = cur.execute(
+            "SELECT sql FROM sqlite_master WHERE type='index' AND name='ux_cmd_natkey'"
+        ).fetchone()
+        if old and "ifnull" not in old[0]:
+            cur.execute("DROP INDEX ux_cmd_natkey")
+        try:
+            cur.execute(NATKEY_INDEX)
+            has_natkey = True
+        except sqlite3.IntegrityError:
+            # Vaults seeded twice by older versions already hold duplicate
+            # rows. Don't delete anything, but without the unique index
+            # INSERT OR IGNORE can't skip existing rows, so the seed is
+            # inserted with an explicit existence check instead.
+            has_natkey = False
+        # Re-seeding an existing vault: drop the sync triggers for the load,
+        # the rebuild below re-indexes every row anyway.
+        for name in ("commands_ai", "commands_ad", "commands_au"):
+            cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute("DROP INDEX IF EXISTS idx_cmd_title")
+        cur.execute("DROP INDEX IF EXISTS idx_cmd_category")  # now idx_cmd_cat_fav
+        # One timestamp for the whole load (UTC, same format as datetime('now'))
+        # instead of evaluating the column DEFAULTs per row.
+        now = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        rows = list(_seed_rows(load_seed(), now))
+        if has_natkey:
+            _insert_rows(cur, rows)
+        else:
+            _insert_missing_rows(cur, rows)
+        for index in INDEXES:
+            cur.execute(index)
+
+        cur.execute(FTS_SCHEMA)
+        cur.execute("INSERT INTO commands_fts(commands_fts) VALUES('rebuild')")
+        cur.execute("INSERT INTO commands_fts(commands_fts) VALUES('optimize')")
+        for trigger in FTS_TRIGGERS:
+            cur.execute(trigger)
+        cur.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    except BaseException:
+        cur.execute("ROLLBACK")
+        raise
+    cur.execute("COMMIT")
+
+    # Give the planner statistics up front so the first searches don't run
+    # without sqlite_stat1; a new database is also compacted.
+    con.execute("ANALYZE")
+    con.execute("PRAGMA optimize")
+    if fresh:
+        con.execute("VACUUM")
+
+
+def migrate(con: "sqlite3.Connection") -> None:
+    """Add the indexes and FTS table a vault seeded by an older version lacks.
+
+    Callers check PRAGMA user_version against SCHEMA_VERSION first, so this
+    runs once per vault. Raises sqlite3.Error if the commands table is
+    missing or the database is read-only.
+    """
+    import sqlite3
+
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute("DROP INDEX IF EXISTS idx_cmd_title")
+        con.execute("DROP INDEX IF EXISTS idx_cmd_category")  # now idx_cmd_cat_fav
+        for index in INDEXES:
+            con.execute(index)
+        has_fts = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='commands_fts'"
+        ).fetchone()
+        if not has_fts:
+            con.execute("SAVEPOINT fts")
+            try:
+                con.execute(FTS_SCHEMA)
+                con.execute("INSERT INTO commands_fts(commands_fts) VALUES('rebuild')")
+                for trigger in FTS_TRIGGERS:
+                    con.execute(trigger)
+            except sqlite3.OperationalError:
+                # No FTS5 in this SQLite build; searches fall back to LIKE
+                con.execute("ROLLBACK TO fts")
+            con.execute("RELEASE fts")
+        con.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    con.execute("COMMIT")
+
+
+def seed_db(path: str) -> None:
+    """Create the schema at *path* and load the built-in library."""
+    import sqlite3
+
+    if os.path.exists(path):
+        # Merging into an existing vault has to happen in place.
+        con = sqlite3.connect(path)
+        _load(con, fresh=False)
+    else:
+        # Build a new vault entirely in RAM and write it out in one pass.
+        mem = sqlite3.connect(":memory:")
+        _load(mem, fresh=True)
+        con = sqlite3.connect(path)
+        mem.backup(con)
+        mem.close()
+
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.close()
 
-def init_db(drop_existing: bool = False) -> None:
-    if drop_existing and os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
-        print(f"Removed existing DB: {DB_PATH}")
 
+def _copy_template() -> bool:
+    """Copy the pre-built vault into place; False if unavailable or corrupt."""
+    if not os.path.exists(TEMPLATE_DB_PATH):
+        return False
+    import shutil
+    import sqlite3
+
+    shutil.copyfile(TEMPLATE_DB_PATH, DB_PATH)
     con = sqlite3.connect(DB_PATH)
-    con.executescript(SCHEMA)
-    con.commit()
+    try:
+        ok = con.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+    except sqlite3.Error:
+        ok = False
+    finally:
+        con.close()
+    if not ok:
+        os.remove(DB_PATH)
+    return ok
 
-    cur = con.cursor()
-    cur.executemany(
-        "INSERT INTO commands(category, subcategory, title, command, description, tags, is_favorite) "
-        "VALUES (?,?,?,?,?,?,?)",
-        SEED_DATA,
-    )
-    con.commit()
+
+def init_db(drop_existing: bool = False) -> None:
+    import sqlite3
+
+    if drop_existing:
+        try:
+            os.unlink(DB_PATH)
+            print(f"Removed existing DB: {DB_PATH}")
+        except FileNotFoundError:
+            pass
+
+    # A fresh install just copies the release's pre-built vault; seeding is
+    # only needed for source checkouts or when merging into an existing DB.
+    if os.path.exists(DB_PATH) or not _copy_template():
+        seed_db(DB_PATH)
+
+    con = sqlite3.connect(DB_PATH)
     count = con.execute("SELECT COUNT(*) FROM commands").fetchone()[0]
     con.close()
     print(f"DB ready: {DB_PATH}")
@@ -444,6 +359,5 @@ def init_db(drop_existing: bool = False) -> None:
 
 
 if __name__ == "__main__":
-    import sys
     drop = "--reset" in sys.argv
     init_db(drop_existing=drop)
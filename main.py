@@ -7,12 +7,19 @@ Author: Filip Ristevski
 License: MIT
 """
 
+import atexit
 import os
 import re
 import sqlite3
-import subprocess
 import sys
-from typing import Any
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Iterator
+
+# subprocess is imported inside the actions that spawn processes, keeping
+# it off the per-query import path.
 
 # Bundle dependencies (lib/ folder) so the plugin works with Flow Launcher's
 # embedded Python without requiring a separate pip install step.
@@ -22,6 +29,8 @@ if _lib not in sys.path:
 
 from flowlauncher import FlowLauncher  # type: ignore
 
+from db_init import LIKE_ESCAPE, LIKE_ESCAPE_SQL, SCHEMA_VERSION, migrate
+
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
@@ -40,34 +49,81 @@ CATEGORY_PREFIX = {
     "Ansible": "[A]",
 }
 
+# Favorites fall back to the plain icon when the star image isn't shipped.
+_STAR_ICON = ICON_STAR if os.path.exists(os.path.join(PLUGIN_DIR, ICON_STAR)) else ICON
+
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
-def _db() -> sqlite3.Connection:
-    con = sqlite3.connect(DB_PATH)
+_CONN: sqlite3.Connection | None = None
+_CONN_LOCK = threading.RLock()
+_HAS_FTS = False  # probed once when _CONN is opened
+_DB_READY = False  # set once the commands table has been seen
+
+
+# Read-heavy tuning: fewer fsyncs on the rare writes, temp b-trees in RAM and
+# pages served from the mmap'd file instead of read() calls.
+_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-20000;
+PRAGMA busy_timeout=2000;
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
     con.row_factory = sqlite3.Row
-    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(_PRAGMAS)
+    # A header read; the DDL only runs for vaults seeded by older versions
+    if con.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        try:
+            migrate(con)
+        except sqlite3.Error:
+            pass  # table missing (handled by _db_ready) or database read-only
     return con
 
 
-def _icon(row) -> str:
-    if row["is_favorite"]:
-        if os.path.exists(os.path.join(PLUGIN_DIR, ICON_STAR)):
-            return ICON_STAR
-    return ICON
+@contextmanager
+def _db() -> Iterator[sqlite3.Connection]:
+    """Yield the shared connection, opening it on first use."""
+    global _CONN, _HAS_FTS
+    with _CONN_LOCK:
+        if _CONN is None:
+            _CONN = _connect()
+            _HAS_FTS = _fts_ok(_CONN)
+            atexit.register(_optimize)
+        yield _CONN
+
+
+def _optimize() -> None:
+    """Refresh planner stats for the query shapes this process ran."""
+    try:
+        with _db() as con:
+            con.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass
 
 
 def _db_ready() -> bool:
     """Return True if the vault database exists and the commands table is accessible."""
+    global _DB_READY
+    # Only a positive result is remembered: until :init has run, every
+    # query re-checks so the vault is picked up as soon as it exists.
+    if _DB_READY:
+        return True
     if not os.path.exists(DB_PATH):
         return False
     try:
         with _db() as con:
             con.execute("SELECT 1 FROM commands LIMIT 1")
-        return True
     except sqlite3.Error:
         return False
+    _DB_READY = True
+    return True
 
 
 def _fts_ok(con: sqlite3.Connection) -> bool:
@@ -78,16 +134,23 @@ def _fts_ok(con: sqlite3.Connection) -> bool:
         return False
 
 
-_OPERATORS = {
-    # category
-    "cat": "category", "c": "category", "category": "category",
-    # subcategory
-    "sub": "subcategory", "s": "subcategory", "subcategory": "subcategory",
-    # tag
-    "tag": "tag", "t": "tag",
-    # favorites
-    "fav": "favorites", "f": "favorites", "favorite": "favorites", "favorites": "favorites",
-}
+def _reprobe() -> None:
+    """Re-run the FTS probe after the schema changed under the open connection."""
+    global _HAS_FTS
+    with _db() as con:
+        _HAS_FTS = _fts_ok(con)
+
+
+# One scan per query: either an operator token (alias:value) or a plain word.
+# Aliases -- category: cat/c, subcategory: sub/s, tag: tag/t,
+# favorites: fav/f/favorite/favorites.
+_TOKEN_RE = re.compile(
+    r"(?:(?P<fav>fav|f|favorites?)|(?P<cat>cat|c|category)"
+    r"|(?P<sub>sub|s|subcategory)|(?P<tag>tag|t)):(?P<val>\S*)"
+    r"|(?P<plain>\S+)",
+    re.IGNORECASE,
+)
+
 
 def _parse_query(raw: str) -> tuple[str, dict]:
     """
@@ -101,116 +164,306 @@ def _parse_query(raw: str) -> tuple[str, dict]:
     filters: dict = {}
     plain_tokens: list[str] = []
 
-    for token in raw.split():
-        if ":" in token:
-            key, _, val = token.partition(":")
-            key = key.lower().strip()
-            val = val.strip()
-            op = _OPERATORS.get(key)
-            if op == "favorites":
-                filters["favorites"] = True
-            elif op and val:
-                filters[op] = val
+    for m in _TOKEN_RE.finditer(raw):
+        plain = m.group("plain")
+        if plain is not None:
+            plain_tokens.append(plain)
+        elif m.group("fav") is not None:
+            filters["favorites"] = True
+        elif val := m.group("val"):
+            if m.group("cat") is not None:
+                filters["category"] = val
+            elif m.group("sub") is not None:
+                filters["subcategory"] = val
             else:
-                plain_tokens.append(token)
+                filters["tag"] = val
         else:
-            plain_tokens.append(token)
+            plain_tokens.append(m.group(0))  # operator without a value
 
     return " ".join(plain_tokens), filters
 
 
-def _search(query: str) -> list:
-    raw = (query or "").strip()
+# Filter-shape bits for _search_sql()
+_SHAPE_FAV   = 1 << 4
+_SHAPE_CAT   = 1 << 3
+_SHAPE_SUB   = 1 << 2
+_SHAPE_TAG   = 1 << 1
+_SHAPE_PLAIN = 1 << 0
+
+_SQL_CACHE: dict[tuple[int, bool], str] = {}
+
+
+# Fixed statements, kept as constants so each call hits the statement cache.
+_SQL_TOGGLE_FAV = (
+    "UPDATE commands "
+    "SET is_favorite = CASE WHEN is_favorite=1 THEN 0 ELSE 1 END, "
+    "    updated_at = datetime('now') "
+    "WHERE id = ?"
+)
+
+# Only the columns query() renders, not every TEXT column of the row.
+# Search rows are plain tuples in this order.
+_SEARCH_COLS = "id, title, category, subcategory, is_favorite, command, description"
+_SEARCH_COLS_FTS = ", ".join("c." + c for c in _SEARCH_COLS.split(", "))
+# Same tuple shape as a search row, for ids query() hasn't returned
+_SQL_GET_COMMAND = f"SELECT {_SEARCH_COLS} FROM commands WHERE id = ?"
+# bm25 weights in commands_fts column order: title, command, description,
+# tags, category, subcategory. A title hit outranks one in the description.
+_FTS_RANK = "bm25(commands_fts, 8.0, 4.0, 1.0, 2.0, 4.0, 2.0)"
+
+
+def _search_sql(shape: int, fts: bool) -> str:
+    """
+    Return the SQL text for a filter shape, building it once.
+
+    Reusing the exact same text for a shape lets sqlite3's statement cache
+    hand back the already-prepared statement instead of re-planning it.
+    """
+    sql = _SQL_CACHE.get((shape, fts))
+    if sql is not None:
+        return sql
+
+    col = "c." if fts else ""
+    conditions: list[str] = []
+    if shape & _SHAPE_FAV:
+        conditions.append(f"{col}is_favorite = 1")
+    if shape & _SHAPE_CAT:
+        conditions.append(f"{col}category LIKE ?{LIKE_ESCAPE_SQL}")
+    if shape & _SHAPE_SUB:
+        conditions.append(f"{col}subcategory LIKE ?{LIKE_ESCAPE_SQL}")
+    if shape & _SHAPE_TAG:
+        conditions.append(f"{col}tags LIKE ?{LIKE_ESCAPE_SQL}")
+
+    if fts:
+        sql = (
+            f"SELECT {_SEARCH_COLS_FTS} FROM commands_fts f "
+            "JOIN commands c ON c.id = f.rowid "
+            "WHERE commands_fts MATCH ? "
+            + "".join(f"AND {c} " for c in conditions)
+            + f"ORDER BY c.is_favorite DESC, {_FTS_RANK} LIMIT 50"
+        )
+    else:
+        if shape & _SHAPE_PLAIN:
+            conditions.append("(" + " OR ".join(
+                f"{c} LIKE ?{LIKE_ESCAPE_SQL}"
+                for c in ("title", "command", "description", "tags", "category", "subcategory")
+            ) + ")")
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        sql = (
+            f"SELECT {_SEARCH_COLS} FROM commands {where} "
+            "ORDER BY is_favorite DESC, category ASC, subcategory ASC, title ASC "
+            "LIMIT 50"
+        )
+    _SQL_CACHE[(shape, fts)] = sql
+    return sql
+
+
+# Quotes would end an FTS5 string token early; treat them as separators.
+_FTS_SANITIZE = str.maketrans({'"': " ", "'": " "})
+
+
+def _build_fts_q(text: str) -> str:
+    """
+    OR together each word of *text* as a quoted FTS5 prefix token.
+
+    Words with no letters or digits ("-", "%") are dropped: the tokenizer
+    would reduce them to nothing. "" means there is nothing FTS can match.
+    """
+    toks = [t for t in text.translate(_FTS_SANITIZE).split()
+            if any(ch.isalnum() for ch in t)]
+    return '"' + '"* OR "'.join(toks) + '"*' if toks else ""
+
+
+def _like_prefix(val: str) -> str:
+    """
+    LIKE pattern for cat:/sub: filters.
+
+    A prefix pattern can be served by the NOCASE category/subcategory index;
+    a leading * (e.g. "cat:*co") asks for a substring match instead.
+    """
+    if val.startswith("*"):
+        return f"%{val.lstrip('*').translate(LIKE_ESCAPE)}%"
+    return f"{val.translate(LIKE_ESCAPE)}%"
+
+
+# Queries differing only in surrounding whitespace share one cache entry
+def _search(query: str) -> tuple[tuple, ...]:
+    return _search_cached((query or "").strip())
+
+
+@lru_cache(maxsize=128)
+def _search_cached(raw: str) -> tuple[tuple, ...]:
+    """
+    Memoize results per normalized query.
+
+    Typing and backspacing replays the same queries; the rows are immutable
+    tuples, so they can be shared safely. Cleared by _invalidate_caches().
+    """
+    return tuple(_search_uncached(raw))
+
+
+def _search_uncached(raw: str) -> list:
     plain, filters = _parse_query(raw)
 
     with _db() as con:
-        conditions: list[str] = []
+        # Positional tuples skip sqlite3.Row's by-name column lookups.
+        cur = con.cursor()
+        cur.row_factory = None
+        shape = 0
         params: list = []
 
         # ── Operator filters ──────────────────────────────────────────────
         if filters.get("favorites"):
-            conditions.append("is_favorite = 1")
+            shape |= _SHAPE_FAV
         if cat := filters.get("category"):
-            conditions.append("category LIKE ?")
-            params.append(f"%{cat}%")
+            shape |= _SHAPE_CAT
+            params.append(_like_prefix(cat))
         if sub := filters.get("subcategory"):
-            conditions.append("subcategory LIKE ?")
-            params.append(f"%{sub}%")
+            shape |= _SHAPE_SUB
+            params.append(_like_prefix(sub))
         if tag := filters.get("tag"):
-            conditions.append("tags LIKE ?")
-            params.append(f"%{tag}%")
+            shape |= _SHAPE_TAG
+            params.append(f"%{tag.translate(LIKE_ESCAPE)}%")
 
         # ── Plain text search ─────────────────────────────────────────────
         if plain:
-            if _fts_ok(con) and not filters:
-                # FTS5 only when no operator filters (avoids JOIN complexity)
-                fts_q = " OR ".join(f'"{t}"' for t in plain.split() if t)
-                try:
-                    rows = con.execute(
-                        "SELECT c.* FROM commands_fts f "
-                        "JOIN commands c ON c.id = f.rowid "
-                        "WHERE commands_fts MATCH ? "
-                        + (("AND " + " AND ".join(conditions)) if conditions else "")
-                        + " ORDER BY c.is_favorite DESC, rank LIMIT 50",
-                        [fts_q] + params,
-                    ).fetchall()
-                    if rows:
-                        return rows
-                except sqlite3.Error:
-                    pass
-
-            # LIKE fallback
-            like = f"%{plain}%"
-            text_cond = (
-                "(title LIKE ? OR command LIKE ? OR description LIKE ? "
-                " OR tags LIKE ? OR category LIKE ? OR subcategory LIKE ?)"
-            )
-            conditions.append(text_cond)
+            shape |= _SHAPE_PLAIN
+            if _HAS_FTS:
+                # FTS5 with the operator filters applied to the joined rows.
+                # Tokens are prefix queries so partially typed words match.
+                fts_q = _build_fts_q(plain)
+                if fts_q:
+                    try:
+                        rows = cur.execute(
+                            _search_sql(shape, fts=True), [fts_q] + params,
+                        ).fetchall()
+                        if rows:
+                            return rows
+                    except sqlite3.Error:
+                        pass
+
+            # LIKE covers what FTS can't: SQLite built without FTS5, a MATCH
+            # expression FTS5 rejected, text with no tokens ("-"), or a
+            # fragment inside a word ("lan" in "vlan") that found nothing.
+            like = f"%{plain.translate(LIKE_ESCAPE)}%"
             params += [like, like, like, like, like, like]
 
         # ── Build final query ─────────────────────────────────────────────
-        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
-        return con.execute(
-            f"SELECT * FROM commands {where} "
-            "ORDER BY is_favorite DESC, category ASC, subcategory ASC, title ASC "
-            "LIMIT 50",
-            params,
-        ).fetchall()
+        return cur.execute(_search_sql(shape, fts=False), params).fetchall()
 
 
-def _format_title(row) -> str:
-    cat    = row["category"]
-    sub    = row["subcategory"] or ""
-    title  = row["title"]
-    prefix = CATEGORY_PREFIX.get(cat, f"[{cat[0].upper()}]")
-    fav    = "\u2605 " if row["is_favorite"] else ""
+# Category prefixes, grown with "[X]" fallbacks as unknown categories appear
+_PREFIX_CACHE: dict[str, str] = dict(CATEGORY_PREFIX)
+# Indexed by is_favorite (always 0 or 1)
+_FAV_GLYPH = ("", "\u2605 ")
+
+
+def _format_title(title: str, cat: str, sub: str | None, is_favorite: int) -> str:
+    prefix = _PREFIX_CACHE.get(cat) or _PREFIX_CACHE.setdefault(cat, f"[{cat[0].upper()}]")
+    fav    = _FAV_GLYPH[bool(is_favorite)]  # legacy vaults lack the 0/1 CHECK
     if sub:
         return f"{fav}{prefix}  {sub}  \u203a  {title}"
     return f"{fav}{prefix}  {title}"
 
 
-def _format_subtitle(row) -> str:
-    cmd  = row["command"].replace("\n", "  \u21b5  ")  # show newlines as ↵
-    desc = row["description"] or ""
-    has_vars = bool(VAR_PATTERN.search(cmd))
-    hints = []
-    if has_vars:
-        hints.append("\u270e template")       # ✎ template
-    if desc:
-        hints.append(desc)
-    suffix = "   \u00b7   ".join(hints)       # ·
-    return f"{cmd}   {suffix}" if suffix else cmd
+@lru_cache(maxsize=512)
+def _has_vars(command: str) -> bool:
+    return VAR_PATTERN.search(command) is not None
+
+
+def _format_subtitle(command: str, desc: str | None) -> str:
+    # show newlines as ↵ (most commands are single-line, skip the copy)
+    cmd  = command.replace("\n", "  \u21b5  ") if "\n" in command else command
+    # "{" in command is a cheap pre-check before the memoized regex
+    if "{" in command and _has_vars(command):
+        cmd = f"{cmd}   \u270e template"     # ✎ template
+        return f"{cmd}   \u00b7   {desc}" if desc else cmd   # ·
+    return f"{cmd}   {desc}" if desc else cmd
+
+
+_CF_UNICODETEXT = 13
+_GMEM_MOVEABLE = 0x0002
+# Another app may hold the clipboard for a moment; retry before spawning clip.exe
+_OPEN_CLIPBOARD_TRIES = 5
+
+
+@lru_cache(maxsize=1)
+def _win32_clipboard_api():
+    """Load user32/kernel32 with pointer-safe signatures (raises off Windows)."""
+    import ctypes
+    from ctypes import wintypes
+
+    user32 = ctypes.WinDLL("user32", use_last_error=True)
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    user32.OpenClipboard.argtypes = [wintypes.HWND]
+    user32.OpenClipboard.restype = wintypes.BOOL
+    user32.EmptyClipboard.restype = wintypes.BOOL
+    user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+    user32.SetClipboardData.restype = wintypes.HANDLE
+    user32.CloseClipboard.restype = wintypes.BOOL
+    kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
+    kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+    kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalLock.restype = wintypes.LPVOID
+    kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalUnlock.restype = wintypes.BOOL
+    kernel32.GlobalFree.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalFree.restype = wintypes.HGLOBAL
+    return ctypes, user32, kernel32
+
+
+def _set_clipboard_win32(text: str) -> None:
+    """Copy text via the Win32 clipboard API, in-process."""
+    ctypes, user32, kernel32 = _win32_clipboard_api()
+    # NUL-terminated in one encode, no second bytes object for the terminator
+    data = (text + "\0").encode("utf-16-le", "surrogatepass")
+
+    for attempt in range(_OPEN_CLIPBOARD_TRIES):
+        if user32.OpenClipboard(None):
+            break
+        if attempt == _OPEN_CLIPBOARD_TRIES - 1:
+            raise ctypes.WinError(ctypes.get_last_error())
+        time.sleep(0.01)
+    try:
+        user32.EmptyClipboard()
+        handle = kernel32.GlobalAlloc(_GMEM_MOVEABLE, len(data))
+        if not handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        ptr = kernel32.GlobalLock(handle)
+        if not ptr:
+            kernel32.GlobalFree(handle)
+            raise ctypes.WinError(ctypes.get_last_error())
+        ctypes.memmove(ptr, data, len(data))
+        kernel32.GlobalUnlock(handle)
+        # On success the clipboard owns the memory; only free it on failure.
+        if not user32.SetClipboardData(_CF_UNICODETEXT, handle):
+            kernel32.GlobalFree(handle)
+            raise ctypes.WinError(ctypes.get_last_error())
+    finally:
+        user32.CloseClipboard()
 
 
 def _set_clipboard(text: str) -> None:
+    """Copy text to the Windows clipboard, falling back to clip.exe."""
+    try:
+        _set_clipboard_win32(text)
+    except Exception:
+        _set_clipboard_clip(text)
+
+
+def _set_clipboard_clip(text: str) -> None:
     """Copy text to Windows clipboard using clip.exe."""
+    import subprocess
+
     p = subprocess.Popen(
         ["clip"],
         stdin=subprocess.PIPE,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
+        creationflags=subprocess.CREATE_NO_WINDOW,
     )
-    p.communicate(text.encode("utf-16-le"))
+    # The BOM lets clip.exe on older Windows detect UTF-16 input
+    p.communicate(b"\xff\xfe" + text.encode("utf-16-le", "surrogatepass"))
 
 
 def _expand_template(command: str, title: str) -> str:
@@ -218,47 +471,158 @@ def _expand_template(command: str, title: str) -> str:
     if not VAR_PATTERN.search(command):
         return command
 
-    import sys
-    import json as _json
+    # Runs in-process: no interpreter start-up or JSON round-trip per prompt
+    try:
+        import template_dialog
+        filled = template_dialog.run(command, title)
+    except Exception:  # tkinter missing or Tk unable to start
+        filled = None
+
+    return filled or command  # fallback: return unchanged if dialog was cancelled
+
+
+_CHECKPOINT_EVERY = 50  # writes between passive WAL checkpoints
+_writes_since_checkpoint = 0
 
-    dialog = os.path.join(PLUGIN_DIR, "template_dialog.py")
-    payload = _json.dumps({"command": command, "title": title})
 
+def _checkpoint() -> None:
     try:
-        result = subprocess.run(
-            [sys.executable, dialog, payload],
-            capture_output=True, text=True, timeout=120,
-        )
-        if result.returncode == 0 and result.stdout:
-            return result.stdout
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+        with _db() as con:
+            con.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    except sqlite3.Error:
         pass
 
-    return command  # fallback: return unchanged if dialog was cancelled
+
+def _note_write() -> None:
+    """Count a commit and periodically fold the WAL back off the hot path."""
+    global _writes_since_checkpoint
+    _writes_since_checkpoint += 1
+    if _writes_since_checkpoint >= _CHECKPOINT_EVERY:
+        _writes_since_checkpoint = 0
+        threading.Thread(target=_checkpoint, daemon=True).start()
+
+
+# Search rows by id, so context_menu / copy_command can reuse what query()
+# just returned instead of looking the command up again. Capped at what the
+# _results_cached entries can hold (64 lists of at most 50 rows); past that
+# it starts over, and a missing id costs one lookup by primary key.
+_ROWS_BY_ID: dict[int, tuple] = {}
+_ROWS_BY_ID_MAX = 64 * 50
+
+
+def _get_row(cmd_id: int) -> tuple | None:
+    # The manager may have edited the row since it was cached
+    _check_data_version()
+    row = _ROWS_BY_ID.get(cmd_id)
+    if row is None:
+        with _db() as con:
+            cur = con.cursor()
+            cur.row_factory = None
+            row = cur.execute(_SQL_GET_COMMAND, (cmd_id,)).fetchone()
+    return row
 
 
 def _toggle_favorite(cmd_id: int) -> None:
     with _db() as con:
-        con.execute(
-            "UPDATE commands "
-            "SET is_favorite = CASE WHEN is_favorite=1 THEN 0 ELSE 1 END, "
-            "    updated_at = datetime('now') "
-            "WHERE id = ?",
-            (cmd_id,),
-        )
-        con.commit()
+        con.execute(_SQL_TOGGLE_FAV, (cmd_id,))
+    _note_write()
+    _invalidate_caches()
+
+
+_NO_RESULTS = [
+    {
+        "Title": "No commands found",
+        "SubTitle": (
+            "cv [text]  ·  cat:cisco  ·  sub:*vlan (* = contains)  ·  tag:ccna  ·  fav:  ·  :manage"
+        ),
+        "IcoPath": ICON,
+        "JsonRPCAction": {
+            "method": "noop",
+            "parameters": [],
+            "dontHideAfterAction": True,
+        },
+    }
+]
+
+
+@lru_cache(maxsize=64)
+def _results_cached(q: str) -> list[dict[str, Any]]:
+    """
+    Formatted Flow Launcher results for a stripped query.
+
+    Flow Launcher serializes the list without mutating it, so a cached list
+    can be handed back as-is.
+    """
+    rows = _search(q)
+    if not rows:
+        return _NO_RESULTS
+    if len(_ROWS_BY_ID) >= _ROWS_BY_ID_MAX:
+        _ROWS_BY_ID.clear()
+    _ROWS_BY_ID.update((row[0], row) for row in rows)
+    return [
+        {
+            "Title": _format_title(title, cat, sub, fav),
+            "SubTitle": _format_subtitle(cmd, desc),
+            "IcoPath": _STAR_ICON if fav else ICON,
+            "JsonRPCAction": {
+                "method": "copy_command",
+                "parameters": [id_, title],
+                "dontHideAfterAction": False,
+            },
+            "ContextData": id_,
+        }
+        for id_, title, cat, sub, fav, cmd, desc in rows
+    ]
+
+
+_DATA_VERSION: int | None = None
+
+
+def _invalidate_caches() -> None:
+    _search_cached.cache_clear()
+    _results_cached.cache_clear()
+    _ROWS_BY_ID.clear()
+
+
+def _check_data_version() -> None:
+    """Drop cached results when another connection (e.g. the manager) committed."""
+    global _DATA_VERSION
+    with _db() as con:
+        version = con.execute("PRAGMA data_version").fetchone()[0]
+    if version != _DATA_VERSION:
+        if _DATA_VERSION is not None:
+            _invalidate_caches()
+        _DATA_VERSION = version
 
 
 # ---------------------------------------------------------------------------
 # Plugin class
 # ---------------------------------------------------------------------------
+_INIT_SENTINELS = frozenset({":init", ":setup", ":initialize"})
+_MANAGE_SENTINELS = frozenset({":manage", ":manager", ":edit", ":gui"})
+
+# Static result; Flow Launcher serializes it, so sharing one list is safe.
+_MANAGE_RESULT = [
+    {
+        "Title": "Open Command Vault Manager",
+        "SubTitle": "Add, edit, delete and organize your commands in a GUI",
+        "IcoPath": ICON,
+        "JsonRPCAction": {
+            "method": "open_manager",
+            "parameters": [],
+            "dontHideAfterAction": True,
+        },
+    }
+]
+
+
 class CommandVault(FlowLauncher):
 
     def query(self, query: str) -> list[dict[str, Any]]:
         q = query.strip()
 
         # Special command: initialize the database
-        if q in (":init", ":setup", ":initialize"):
+        if q in _INIT_SENTINELS:
             if _db_ready():
                 return [
                     {
@@ -301,69 +665,25 @@ class CommandVault(FlowLauncher):
             ]
 
         # Special command: open the GUI manager
-        if q in (":manage", ":manager", ":edit", ":gui"):
-            return [
-                {
-                    "Title": "Open Command Vault Manager",
-                    "SubTitle": "Add, edit, delete and organize your commands in a GUI",
-                    "IcoPath": ICON,
-                    "JsonRPCAction": {
-                        "method": "open_manager",
-                        "parameters": [],
-                        "dontHideAfterAction": True,
-                    },
-                }
-            ]
+        if q in _MANAGE_SENTINELS:
+            return _MANAGE_RESULT
 
-        rows = _search(query)
-        if not rows:
-            return [
-                {
-                    "Title": "No commands found",
-                    "SubTitle": (
-                        "cv [text]  ·  cat:cisco  ·  sub:vlan  ·  tag:ccna  ·  fav:  ·  :manage"
-                    ),
-                    "IcoPath": ICON,
-                    "JsonRPCAction": {
-                        "method": "noop",
-                        "parameters": [],
-                        "dontHideAfterAction": True,
-                    },
-                }
-            ]
-
-        results = []
-        for r in rows:
-            results.append(
-                {
-                    "Title": _format_title(r),
-                    "SubTitle": _format_subtitle(r),
-                    "IcoPath": _icon(r),
-                    "JsonRPCAction": {
-                        "method": "copy_command",
-                        "parameters": [r["id"], r["title"]],
-                        "dontHideAfterAction": False,
-                    },
-                    "ContextData": r["id"],
-                }
-            )
-        return results
+        # Results are reused until this plugin or the manager writes
+        _check_data_version()
+        return _results_cached(q)
 
     def context_menu(self, data: Any) -> list[dict[str, Any]]:
         cmd_id = int(data) if data else None
         if not cmd_id:
             return []
 
-        with _db() as con:
-            row = con.execute(
-                "SELECT * FROM commands WHERE id = ?", (cmd_id,)
-            ).fetchone()
-
+        row = _get_row(cmd_id)
         if not row:
             return []
+        _, title, _, _, is_favorite, command, _ = row
 
-        fav_label = "\u2605  Remove from favorites" if row["is_favorite"] else "\u2606  Add to favorites"
-        cmd_preview = row["command"][:80] + ("…" if len(row["command"]) > 80 else "")
+        fav_label = "\u2605  Remove from favorites" if is_favorite else "\u2606  Add to favorites"
+        cmd_preview = command[:80] + ("…" if len(command) > 80 else "")
 
         return [
             {
@@ -372,7 +692,7 @@ class CommandVault(FlowLauncher):
                 "IcoPath": ICON,
                 "JsonRPCAction": {
                     "method": "copy_command",
-                    "parameters": [cmd_id, row["title"]],
+                    "parameters": [cmd_id, title],
                     "dontHideAfterAction": False,
                 },
             },
@@ -411,13 +731,10 @@ class CommandVault(FlowLauncher):
     # ---- Actions -----------------------------------------------------------
 
     def copy_command(self, cmd_id: int, title: str) -> None:
-        with _db() as con:
-            row = con.execute(
-                "SELECT * FROM commands WHERE id = ?", (cmd_id,)
-            ).fetchone()
+        row = _get_row(cmd_id)
         if not row:
             return
-        cmd = _expand_template(row["command"], title)
+        cmd = _expand_template(row[5], title)
         _set_clipboard(cmd)
         short = cmd if len(cmd) <= 60 else cmd[:57] + "\u2026"
         try:
@@ -429,20 +746,24 @@ class CommandVault(FlowLauncher):
         _toggle_favorite(cmd_id)
 
     def open_vault_folder(self) -> None:
+        import subprocess
         subprocess.Popen(["explorer", PLUGIN_DIR])
 
     def open_manager(self) -> None:
-        import sys
+        import subprocess
         manager = os.path.join(PLUGIN_DIR, "manager.py")
         subprocess.Popen(
             [sys.executable, manager],
-            creationflags=subprocess.DETACHED_PROCESS,
+            # Own process group: a Ctrl+C / Ctrl+Break sent to Flow's
+            # console group doesn't reach the manager window.
+            creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP,
         )
 
     def run_init(self) -> None:
         import db_init as _db_init
         try:
             _db_init.init_db(drop_existing=False)
+            _reprobe()
             try:
                 self.show_msg(
                     "\u2713  Vault ready!",
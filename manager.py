@@ -3,11 +3,17 @@ Command Vault Manager  —  GUI editor for vault.db
 Launch: python manager.py  |  Flow Launcher: cv :manage
 """
 
+import atexit
 import json
 import os
+import queue
 import sqlite3
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+from tkinter import font as tkfont
+
+from db_init import LIKE_ESCAPE, LIKE_ESCAPE_SQL, SCHEMA_VERSION, migrate
 
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vault.db")
 
@@ -42,63 +48,262 @@ CATEGORY_COLORS = {
     "Default": "#CDD6F4",
 }
 
+# Quiet period after the last keystroke before the table is re-queried
+SEARCH_DEBOUNCE_MS = 120
+READ_POLL_MS = 15  # how often the Tk thread checks for reader-thread results
+
+# Named fonts, created once by _load_fonts() after the Tk root exists and
+# shared by every widget instead of re-resolving a tuple per widget.
+FONT_SPECS = {
+    "ui8b":   ("Segoe UI", 8, "bold"),
+    "ui9":    ("Segoe UI", 9, "normal"),
+    "ui9b":   ("Segoe UI", 9, "bold"),
+    "ui10":   ("Segoe UI", 10, "normal"),
+    "ui10b":  ("Segoe UI", 10, "bold"),
+    "ui11":   ("Segoe UI", 11, "normal"),
+    "ui13b":  ("Segoe UI", 13, "bold"),
+    "ui16":   ("Segoe UI", 16, "normal"),
+    "mono11": ("Consolas", 11, "normal"),
+}
+FONTS = {}
+
+def _load_fonts(root):
+    for name, (family, size, weight) in FONT_SPECS.items():
+        FONTS[name] = tkfont.Font(root, family=family, size=size, weight=weight)
+
+# Treeview row tags, shared by every row instead of rebuilt per row
+TAG_FAV  = ("fav",)
+TAG_EVEN = ("even",)
+TAG_NONE = ()
+
 # ── DB helpers ────────────────────────────────────────────────────────────────
-def _db():
-    con = sqlite3.connect(DB_PATH)
+_CON = None
+_HAS_FTS = False  # commands_fts is present; probed when _CON is opened
+
+def _connect():
+    # Room for every _SQL_FETCH variant plus the fixed statements; the
+    # default statement cache holds only 128.
+    con = sqlite3.connect(DB_PATH, cached_statements=len(_SQL_FETCH) + 32)
     con.row_factory = sqlite3.Row
-    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA mmap_size=268435456;"
+        "PRAGMA cache_size=-20000;"
+        "PRAGMA busy_timeout=5000;"
+    )
     return con
 
-def fetch_categories():
-    with _db() as con:
-        rows = con.execute("SELECT category, COUNT(*) as cnt FROM commands GROUP BY category ORDER BY category").fetchall()
-        total = con.execute("SELECT COUNT(*) FROM commands").fetchone()[0]
-    return total, rows
+def _db():
+    """Shared main-thread connection. Reads use it directly; writes go
+    through `with _db() as con:` so a failed statement rolls back.
+    Table queries run on VaultManager's reader thread with their own
+    connection (see _reader_loop)."""
+    global _CON, _HAS_FTS
+    if _CON is None:
+        con = _connect()
+        # Vaults seeded by older versions lack the category / sort indexes
+        if con.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            try:
+                migrate(con)
+            except sqlite3.Error:
+                pass
+        try:
+            con.execute("SELECT 1 FROM commands_fts LIMIT 1")
+            _HAS_FTS = True
+        except sqlite3.Error:
+            _HAS_FTS = False
+        _CON = con
+        atexit.register(_close_db)
+    return _CON
+
+def _close_db():
+    """Let SQLite refresh planner stats for the queries this session ran."""
+    try:
+        _CON.execute("PRAGMA optimize")
+        _CON.close()
+    except sqlite3.Error:
+        pass
+
+# ── SQL ───────────────────────────────────────────────────────────────────────
+# Built once so every call passes identical text and hits sqlite3's
+# prepared-statement cache.
+_SQL_CATEGORIES = "SELECT category, COUNT(*) as cnt, SUM(is_favorite) as favs FROM commands GROUP BY category ORDER BY category"
+_SQL_GET        = "SELECT * FROM commands WHERE id=?"
+_SQL_GET_TITLE  = "SELECT title FROM commands WHERE id=?"
+_SQL_INSERT     = "INSERT INTO commands(category,subcategory,title,command,description,tags,is_favorite) VALUES(?,?,?,?,?,?,?)"
+_SQL_INSERT_OR_IGNORE = _SQL_INSERT.replace("INSERT", "INSERT OR IGNORE", 1)
+_SQL_INSERT_RETURNING = _SQL_INSERT + " RETURNING id"
+_SQL_UPDATE     = "UPDATE commands SET category=?,subcategory=?,title=?,command=?,description=?,tags=?,is_favorite=?,updated_at=datetime('now') WHERE id=?"
+_SQL_DELETE     = "DELETE FROM commands WHERE id=?"
+_SQL_TOGGLE_FAV = "UPDATE commands SET is_favorite=CASE WHEN is_favorite=1 THEN 0 ELSE 1 END WHERE id=?"
+
+# Treeview column -> ORDER BY. Only these fixed strings ever reach the SQL.
+# Columns are qualified with the "c" alias because commands_fts has
+# same-named columns when it is joined in.
+_DEFAULT_ORDER = "c.is_favorite DESC, c.category, c.subcategory, c.title"
+_SORT_COLUMNS = {
+    "fav":         "is_favorite",
+    "category":    "category",
+    "subcategory": "subcategory",
+    "title":       "title",
+    "command":     "command",
+    "description": "description",
+    "tags":        "tags",
+}
 
-def fetch_commands(search="", category=None, favorites_only=False):
-    with _db() as con:
-        conditions, params = [], []
-        if search:
-            like = f"%{search}%"
-            conditions.append("(title LIKE ? OR command LIKE ? OR description LIKE ? OR tags LIKE ?)")
-            params += [like, like, like, like]
-        if category:
-            conditions.append("category = ?")
-            params.append(category)
-        if favorites_only:
-            conditions.append("is_favorite = 1")
-        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
-        return con.execute(
-            f"SELECT * FROM commands {where} ORDER BY is_favorite DESC, category, subcategory, title",
-            params
-        ).fetchall()
+def _order_by(sort, descending):
+    if sort is None:
+        return _DEFAULT_ORDER
+    return f"c.{_SORT_COLUMNS[sort]} {'DESC' if descending else 'ASC'}, {_DEFAULT_ORDER}"
+
+# Search modes: None (no search text), "fts" (commands_fts MATCH) or "like"
+# (substring scan, used when the vault has no FTS table or MATCH fails).
+_SEARCH_MODES = (None, "fts", "like")
+
+def _fetch_sql(search, category, favorites_only, order_by=_DEFAULT_ORDER):
+    conditions = []
+    join = ""
+    if search == "fts":
+        join = "JOIN commands_fts f ON f.rowid = c.id "
+        conditions.append("commands_fts MATCH ?")
+    elif search == "like":
+        # One LIKE over the joined text instead of four; the newline
+        # separator can't occur in a search typed into the Entry.
+        conditions.append(
+            "(c.title || char(10) || c.command || char(10) || "
+            "ifnull(c.description, '') || char(10) || ifnull(c.tags, '')) LIKE ?"
+            + LIKE_ESCAPE_SQL)
+    if category:
+        conditions.append("c.category = ?")
+    if favorites_only:
+        conditions.append("c.is_favorite = 1")
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    # Only the columns the table and the export read (no timestamps);
+    # command_flat is the one-line Treeview preview, flattened by SQLite.
+    return (f"SELECT c.id, c.category, c.subcategory, c.title, c.command, c.description, "
+            f"c.tags, c.is_favorite, replace(c.command, char(10), ' ↵ ') AS command_flat "
+            f"FROM commands c {join}{where} ORDER BY {order_by}")
+
+# (search mode, category?, favorites_only?, sort column, descending?) -> SELECT
+_SQL_FETCH = {
+    (s, c, f, sort, d): _fetch_sql(s, c, f, _order_by(sort, d))
+    for s in _SEARCH_MODES for c in (False, True) for f in (False, True)
+    for sort in (None, *_SORT_COLUMNS) for d in (False, True)
+}
 
+# Quotes would end an FTS5 string token early; treat them as separators.
+_FTS_SANITIZE = str.maketrans({'"': " ", "'": " "})
+
+def _fts_query(search):
+    """Prefix-match every word of *search* in the columns the table shows."""
+    toks = search.translate(_FTS_SANITIZE).split()
+    if not toks:
+        return ""
+    return "{title command description tags} : (" + " ".join(f'"{t}"*' for t in toks) + ")"
+
+def fetch_categories():
+    rows = _db().execute(_SQL_CATEGORIES).fetchall()
+    # Every row has a category, so the per-category counts add up to the
+    # total and the favorites count; one GROUP BY serves the whole sidebar.
+    total = sum(row["cnt"] for row in rows)
+    favs = sum(row["favs"] for row in rows)
+    return total, favs, rows
+
+def fetch_commands(search="", category=None, favorites_only=False, sort=None, descending=False, con=None):
+    return query_commands(search, category, favorites_only, sort, descending, con).fetchall()
+
+def query_commands(search="", category=None, favorites_only=False, sort=None, descending=False, con=None):
+    """Like fetch_commands, but returns the cursor so rows can be streamed.
+    *con* defaults to the shared main-thread connection."""
+    con = con or _db()
+    rest = [category] if category else []
+    key = (bool(category), bool(favorites_only), sort, bool(descending))
+    if search:
+        fts_q = _fts_query(search) if _HAS_FTS else ""
+        if fts_q:
+            try:
+                return con.execute(_SQL_FETCH[("fts", *key)], [fts_q] + rest)
+            except sqlite3.OperationalError:
+                pass  # MATCH syntax FTS5 rejected; fall back to LIKE
+        like = f"%{search.translate(LIKE_ESCAPE)}%"
+        return con.execute(_SQL_FETCH[("like", *key)], [like] + rest)
+    return con.execute(_SQL_FETCH[(None, *key)], rest)
+
+# Writes: leaving the `with` block commits, an exception rolls back.
 def insert_cmd(d):
     with _db() as con:
-        cur = con.execute(
-            "INSERT INTO commands(category,subcategory,title,command,description,tags,is_favorite) VALUES(?,?,?,?,?,?,?)",
+        # RETURNING hands back the id from the INSERT itself; it has to be
+        # fetched before the block commits.
+        new_id = con.execute(_SQL_INSERT_RETURNING,
             (d["category"], d["subcategory"], d["title"], d["command"], d["description"], d["tags"], 1 if d["is_favorite"] else 0)
+        ).fetchone()[0]
+    return new_id
+
+def import_cmds(entries):
+    """Insert JSON export entries in one transaction; returns rows added.
+
+    Entries that duplicate an existing command, or aren't export-shaped,
+    are skipped rather than failing the whole import."""
+    rows = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        row = (
+            entry.get("category", "Imported"),
+            entry.get("subcategory", ""),
+            entry.get("title", "Untitled"),
+            entry.get("command", ""),
+            entry.get("description", ""),
+            entry.get("tags", ""),
         )
-        con.commit()
-        return cur.lastrowid
+        if all(v is None or isinstance(v, str) for v in row):
+            rows.append((*row, 1 if entry.get("is_favorite", 0) else 0))
+    with _db() as con:
+        con.execute("BEGIN IMMEDIATE")
+        # rowcount sums the rows each INSERT added (not the FTS trigger writes)
+        added = con.executemany(_SQL_INSERT_OR_IGNORE, rows).rowcount
+    return added
+
+EXPORT_FIELDS = ("category", "subcategory", "title", "command", "description", "tags", "is_favorite")
+
+def write_export(f, rows):
+    """Stream *rows* to *f* as a JSON array; returns the number written.
+
+    Written one row at a time; the layout matches json.dump(indent=2).
+    JSON strings never contain a raw newline, so re-indenting is safe."""
+    count = 0
+    f.write("[")
+    for row in rows:
+        d = {k: row[k] for k in EXPORT_FIELDS}
+        item = json.dumps(d, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        f.write(("\n  " if not count else ",\n  ") + item)
+        count += 1
+    f.write("\n]" if count else "]")
+    return count
+
+def _changed(row, d):
+    """True if dialog result *d* differs from the stored *row*."""
+    for k, v in d.items():
+        cur = bool(row[k]) if k == "is_favorite" else (row[k] or "")
+        if v != cur:
+            return True
+    return False
 
 def update_cmd(cmd_id, d):
     with _db() as con:
-        con.execute(
-            "UPDATE commands SET category=?,subcategory=?,title=?,command=?,description=?,tags=?,is_favorite=?,updated_at=datetime('now') WHERE id=?",
+        con.execute(_SQL_UPDATE,
             (d["category"], d["subcategory"], d["title"], d["command"], d["description"], d["tags"], 1 if d["is_favorite"] else 0, cmd_id)
         )
-        con.commit()
 
 def delete_cmd(cmd_id):
     with _db() as con:
-        con.execute("DELETE FROM commands WHERE id=?", (cmd_id,))
-        con.commit()
+        con.execute(_SQL_DELETE, (cmd_id,))
 
 def toggle_fav(cmd_id):
     with _db() as con:
-        con.execute("UPDATE commands SET is_favorite=CASE WHEN is_favorite=1 THEN 0 ELSE 1 END WHERE id=?", (cmd_id,))
-        con.commit()
+        con.execute(_SQL_TOGGLE_FAV, (cmd_id,))
 
 # ── Toast notification ────────────────────────────────────────────────────────
 class Toast(tk.Toplevel):
@@ -109,7 +314,7 @@ class Toast(tk.Toplevel):
         self.configure(bg=SURFACE)
 
         tk.Label(self, text=f"  {message}  ", bg=SURFACE, fg=color,
-                 font=("Segoe UI", 10), pady=10, padx=8).pack()
+                 font=FONTS["ui10"], pady=10, padx=8).pack()
 
         # Position bottom-right of parent
         parent.update_idletasks()
@@ -120,56 +325,91 @@ class Toast(tk.Toplevel):
 
 # ── Command dialog ────────────────────────────────────────────────────────────
 class CommandDialog(tk.Toplevel):
-    def __init__(self, parent, title="Add Command", data=None, prefill_category=None):
+    """Add/Edit form. Built once per manager, then hidden and reused by open()."""
+
+    def __init__(self, parent):
         super().__init__(parent)
-        self.title(title)
+        self.withdraw()
         self.result = None
+        self._on_save = None
         self.configure(bg=BG)
-        self.geometry("700x560")
         self.minsize(600, 500)
         self.resizable(True, True)
         self.transient(parent)
-        self.grab_set()
+        # Set by _close(); open() waits on it since the window is only hidden
+        self._done = tk.BooleanVar(self, False)
 
-        px = parent.winfo_rootx() + parent.winfo_width() // 2 - 350
-        py = parent.winfo_rooty() + parent.winfo_height() // 2 - 280
-        self.geometry(f"+{max(0,px)}+{max(0,py)}")
+        self._build()
+        self.bind("<Escape>", lambda _: self._close())
+        self.bind("<Control-Return>", lambda _: self._save())
+        self.protocol("WM_DELETE_WINDOW", self._close)
+
+    def open(self, title="Add Command", data=None, prefill_category=None, save=None):
+        """Show the form filled from *data*; returns the saved fields or None.
 
+        *save* is called with the fields on Save and returns False to keep
+        the form open (e.g. the command already exists).
+        """
+        self._on_save = save
         d = data or {}
         if prefill_category and not d.get("category"):
             d["category"] = prefill_category
 
-        self._build(d)
-        self.bind("<Escape>", lambda _: self.destroy())
-        self.bind("<Control-Return>", lambda _: self._save())
-        self.wait_window()
+        self.result = None
+        self.title(title)
+        self._heading.config(text=title)
+        self.v_cat.set(d.get("category", ""))
+        self.v_sub.set(d.get("subcategory", "") or "")
+        self.v_title.set(d.get("title", ""))
+        self.t_cmd.delete("1.0", "end")
+        self.t_cmd.insert("1.0", d.get("command", ""))
+        self.v_desc.set(d.get("description", "") or "")
+        self.v_tags.set(d.get("tags", "") or "")
+        self.v_fav.set(bool(d.get("is_favorite", 0)))
+
+        parent = self.master
+        px = parent.winfo_rootx() + parent.winfo_width() // 2 - 350
+        py = parent.winfo_rooty() + parent.winfo_height() // 2 - 280
+        self.geometry(f"700x560+{max(0,px)}+{max(0,py)}")
+        self.deiconify()
+        self.grab_set()
+        self._cat_entry.focus_set()
+
+        self._done.set(False)
+        self.wait_variable(self._done)
+        return self.result
+
+    def _close(self):
+        self.grab_release()
+        self.withdraw()
+        self._done.set(True)
 
     def _field(self, parent, label, var=None, multiline=False, height=4):
         tk.Label(parent, text=label, bg=BG, fg=FG_DIM,
-                 font=("Segoe UI", 9), anchor="w").pack(fill="x", pady=(10, 2))
+                 font=FONTS["ui9"], anchor="w").pack(fill="x", pady=(10, 2))
         if multiline:
             w = tk.Text(parent, height=height, bg=SURFACE, fg=FG,
                         insertbackground=FG, relief="flat",
-                        font=("Consolas", 11), wrap="none",
+                        font=FONTS["mono11"], wrap="none",
                         highlightthickness=1, highlightbackground=BORDER,
                         highlightcolor=ACCENT, padx=8, pady=6)
             w.pack(fill="x")
             return w
         e = tk.Entry(parent, textvariable=var, bg=SURFACE, fg=FG,
-                     insertbackground=FG, relief="flat", font=("Segoe UI", 11),
+                     insertbackground=FG, relief="flat", font=FONTS["ui11"],
                      highlightthickness=1, highlightbackground=BORDER,
                      highlightcolor=ACCENT)
         e.pack(fill="x", ipady=7)
         return e
 
-    def _build(self, d):
+    def _build(self):
         # Header bar
         header = tk.Frame(self, bg=SURFACE, padx=20, pady=14)
         header.pack(fill="x")
-        tk.Label(header, text=self.title(), bg=SURFACE, fg=FG,
-                 font=("Segoe UI", 13, "bold")).pack(side="left")
+        self._heading = tk.Label(header, bg=SURFACE, fg=FG, font=FONTS["ui13b"])
+        self._heading.pack(side="left")
         tk.Label(header, text="Ctrl+Enter to save  ·  Esc to cancel",
-                 bg=SURFACE, fg=FG_DIM, font=("Segoe UI", 9)).pack(side="right")
+                 bg=SURFACE, fg=FG_DIM, font=FONTS["ui9"]).pack(side="right")
 
         body = tk.Frame(self, bg=BG, padx=24, pady=10)
         body.pack(fill="both", expand=True)
@@ -182,58 +422,58 @@ class CommandDialog(tk.Toplevel):
         right = tk.Frame(row, bg=BG)
         right.pack(side="left", fill="x", expand=True)
 
-        self.v_cat = tk.StringVar(value=d.get("category", ""))
-        self.v_sub = tk.StringVar(value=d.get("subcategory", "") or "")
-        tk.Label(left, text="Category  *", bg=BG, fg=FG_DIM, font=("Segoe UI", 9), anchor="w").pack(fill="x", pady=(10,2))
-        tk.Entry(left, textvariable=self.v_cat, bg=SURFACE, fg=FG,
-                 insertbackground=FG, relief="flat", font=("Segoe UI", 11),
+        self.v_cat = tk.StringVar(self)
+        self.v_sub = tk.StringVar(self)
+        tk.Label(left, text="Category  *", bg=BG, fg=FG_DIM, font=FONTS["ui9"], anchor="w").pack(fill="x", pady=(10,2))
+        self._cat_entry = tk.Entry(left, textvariable=self.v_cat, bg=SURFACE, fg=FG,
+                 insertbackground=FG, relief="flat", font=FONTS["ui11"],
                  highlightthickness=1, highlightbackground=BORDER,
-                 highlightcolor=ACCENT).pack(fill="x", ipady=7)
-        tk.Label(right, text="Subcategory", bg=BG, fg=FG_DIM, font=("Segoe UI", 9), anchor="w").pack(fill="x", pady=(10,2))
+                 highlightcolor=ACCENT)
+        self._cat_entry.pack(fill="x", ipady=7)
+        tk.Label(right, text="Subcategory", bg=BG, fg=FG_DIM, font=FONTS["ui9"], anchor="w").pack(fill="x", pady=(10,2))
         tk.Entry(right, textvariable=self.v_sub, bg=SURFACE, fg=FG,
-                 insertbackground=FG, relief="flat", font=("Segoe UI", 11),
+                 insertbackground=FG, relief="flat", font=FONTS["ui11"],
                  highlightthickness=1, highlightbackground=BORDER,
                  highlightcolor=ACCENT).pack(fill="x", ipady=7)
 
-        self.v_title = tk.StringVar(value=d.get("title", ""))
+        self.v_title = tk.StringVar(self)
         self._field(body, "Title  *", self.v_title)
 
         tk.Label(body, text="Command  *   (use {variable} for templates)",
-                 bg=BG, fg=FG_DIM, font=("Segoe UI", 9), anchor="w").pack(fill="x", pady=(10, 2))
+                 bg=BG, fg=FG_DIM, font=FONTS["ui9"], anchor="w").pack(fill="x", pady=(10, 2))
         self.t_cmd = tk.Text(body, height=4, bg=SURFACE, fg=FG,
                              insertbackground=FG, relief="flat",
-                             font=("Consolas", 11), wrap="none",
+                             font=FONTS["mono11"], wrap="none",
                              highlightthickness=1, highlightbackground=BORDER,
                              highlightcolor=ACCENT, padx=8, pady=6)
         self.t_cmd.pack(fill="x")
-        self.t_cmd.insert("1.0", d.get("command", ""))
 
-        self.v_desc = tk.StringVar(value=d.get("description", "") or "")
+        self.v_desc = tk.StringVar(self)
         self._field(body, "Description   (shown as subtitle in Flow Launcher)", self.v_desc)
 
-        self.v_tags = tk.StringVar(value=d.get("tags", "") or "")
+        self.v_tags = tk.StringVar(self)
         self._field(body, "Tags   (comma-separated  ·  e.g. vlan,l2,cisco)", self.v_tags)
 
         # Favorite checkbox
-        self.v_fav = tk.BooleanVar(value=bool(d.get("is_favorite", 0)))
+        self.v_fav = tk.BooleanVar(self)
         fav = tk.Frame(body, bg=BG)
         fav.pack(fill="x", pady=(12, 0))
         tk.Checkbutton(fav, text="  Mark as favorite  ★",
                        variable=self.v_fav, bg=BG, fg=YELLOW,
                        activebackground=BG, activeforeground=YELLOW,
-                       selectcolor=SURFACE, font=("Segoe UI", 10),
+                       selectcolor=SURFACE, font=FONTS["ui10"],
                        relief="flat", cursor="hand2").pack(side="left")
 
         # Buttons
         btn_row = tk.Frame(self, bg=SURFACE, padx=20, pady=14)
         btn_row.pack(fill="x")
-        tk.Button(btn_row, text="Cancel", command=self.destroy,
+        tk.Button(btn_row, text="Cancel", command=self._close,
                   bg=SURFACE2, fg=FG_DIM, activebackground=BORDER,
-                  relief="flat", font=("Segoe UI", 10), padx=18, pady=8,
+                  relief="flat", font=FONTS["ui10"], padx=18, pady=8,
                   cursor="hand2", bd=0).pack(side="right", padx=(6,0))
         tk.Button(btn_row, text="Save Command", command=self._save,
                   bg=ACCENT, fg="#1E1E2E", activebackground=ACCENT_DK,
-                  relief="flat", font=("Segoe UI", 10, "bold"), padx=22, pady=8,
+                  relief="flat", font=FONTS["ui10b"], padx=22, pady=8,
                   cursor="hand2", bd=0).pack(side="right")
 
     def _save(self):
@@ -244,7 +484,7 @@ class CommandDialog(tk.Toplevel):
             messagebox.showwarning("Missing fields",
                 "Category, Title and Command are required.", parent=self)
             return
-        self.result = {
+        result = {
             "category":    cat,
             "subcategory": self.v_sub.get().strip(),
             "title":       title,
@@ -253,12 +493,16 @@ class CommandDialog(tk.Toplevel):
             "tags":        self.v_tags.get().strip(),
             "is_favorite": self.v_fav.get(),
         }
-        self.destroy()
+        if self._on_save is not None and not self._on_save(result):
+            return
+        self.result = result
+        self._close()
 
 # ── Main window ───────────────────────────────────────────────────────────────
 class VaultManager(tk.Tk):
     def __init__(self):
         super().__init__()
+        _load_fonts(self)
         self.title("Command Vault")
         self.geometry("1160x700")
         self.minsize(900, 560)
@@ -266,8 +510,28 @@ class VaultManager(tk.Tk):
 
         self._active_category = None  # None = All
         self._favs_only = False
-        self._sort_col = "category"
+        self._sort_col = None  # None = default favorites-first order
         self._sort_rev = False
+        self._search_after = None  # pending debounced refresh_table
+        self._total = 0            # row count, updated by refresh_sidebar
+        self._row_cache = {}       # iid -> (values, tags) of every Treeview item
+        self._cats_cache = None    # fetch_categories() result until the next edit
+        self._ready = False        # set once _build() has created the widgets
+        self._visible = True       # False while the window is minimized
+        self._stale = False        # a refresh was skipped while minimized
+        self._sidebar_rows = {}    # tag -> (row, accent, inner, label, count) widgets
+        self._sidebar_order = []   # sidebar widgets in packed order
+        self._sidebar_sep = None   # divider between Favorites and the categories
+        self._cmd_dlg = None       # CommandDialog, built on first Add/Edit
+        # Table queries run on a reader thread. It never calls into Tk: rows
+        # come back on _results, which the Tk thread polls while a query is
+        # outstanding, and only the newest request's rows are applied.
+        self._reads = queue.Queue()
+        self._results = queue.Queue()
+        self._read_seq = 0
+        self._done_seq = 0         # newest request the reader has answered
+        self._poll_after = None
+        threading.Thread(target=self._reader_loop, daemon=True).start()
 
         self._setup_style()
         self._build()
@@ -278,6 +542,32 @@ class VaultManager(tk.Tk):
         self.bind("<Delete>",    lambda _: self.cmd_delete())
         self.bind("<Return>",    lambda _: self.cmd_edit())
         self.bind("<F5>",        lambda _: self.full_refresh())
+        self.bind("<Unmap>",     self._on_unmap)
+        self.bind("<Map>",       self._on_map)
+
+    # ── Visibility ───────────────────────────────────────────────────────────
+    # Child widgets inherit these bindings through their bindtags, so only
+    # the toplevel's own events count.
+    def _on_unmap(self, e):
+        if e.widget is self:
+            self._visible = False
+
+    def _on_map(self, e):
+        if e.widget is not self:
+            return
+        self._visible = True
+        if self._stale:
+            self._stale = False
+            self.refresh_sidebar()
+            self.refresh_table()
+
+    def _can_refresh(self):
+        if not self._ready:
+            return False
+        if not self._visible:
+            self._stale = True
+            return False
+        return True
 
     # ── Style ────────────────────────────────────────────────────────────────
     def _setup_style(self):
@@ -285,10 +575,10 @@ class VaultManager(tk.Tk):
         s.theme_use("clam")
         s.configure("Treeview",
             background=BG, foreground=FG, rowheight=38,
-            fieldbackground=BG, borderwidth=0, font=("Segoe UI", 10))
+            fieldbackground=BG, borderwidth=0, font=FONTS["ui10"])
         s.configure("Treeview.Heading",
             background=SIDEBAR, foreground=FG_DIM,
-            borderwidth=0, font=("Segoe UI", 9, "bold"), relief="flat")
+            borderwidth=0, font=FONTS["ui9b"], relief="flat")
         s.map("Treeview",
             background=[("selected", SURFACE)],
             foreground=[("selected", FG)])
@@ -309,9 +599,9 @@ class VaultManager(tk.Tk):
         logo = tk.Frame(topbar, bg=SIDEBAR, padx=20, pady=12)
         logo.pack(side="left")
         tk.Label(logo, text="⚡", bg=SIDEBAR, fg=ACCENT,
-                 font=("Segoe UI", 16)).pack(side="left")
+                 font=FONTS["ui16"]).pack(side="left")
         tk.Label(logo, text=" Command Vault", bg=SIDEBAR, fg=FG,
-                 font=("Segoe UI", 13, "bold")).pack(side="left")
+                 font=FONTS["ui13b"]).pack(side="left")
 
         # Search bar
         search_wrap = tk.Frame(topbar, bg=SIDEBAR, padx=16, pady=10)
@@ -321,11 +611,11 @@ class VaultManager(tk.Tk):
                              highlightthickness=1)
         search_bg.pack(fill="x")
         tk.Label(search_bg, text=" 🔍 ", bg=SURFACE, fg=FG_DIM,
-                 font=("Segoe UI", 11)).pack(side="left")
+                 font=FONTS["ui11"]).pack(side="left")
         self.v_search = tk.StringVar()
-        self.v_search.trace_add("write", lambda *_: self.refresh_table())
+        self.v_search.trace_add("write", self._on_search_change)
         tk.Entry(search_bg, textvariable=self.v_search, bg=SURFACE, fg=FG,
-                 insertbackground=FG, relief="flat", font=("Segoe UI", 11),
+                 insertbackground=FG, relief="flat", font=FONTS["ui11"],
                  bd=0).pack(side="left", fill="x", expand=True, ipady=8, padx=(0,8))
 
         # Action buttons
@@ -333,7 +623,7 @@ class VaultManager(tk.Tk):
         btn_bar.pack(side="right")
 
         def tbtn(text, cmd, fg_col=FG, bg_col=SURFACE2, bold=False):
-            f = ("Segoe UI", 10, "bold") if bold else ("Segoe UI", 10)
+            f = FONTS["ui10b"] if bold else FONTS["ui10"]
             return tk.Button(btn_bar, text=text, command=cmd,
                              bg=bg_col, fg=fg_col, activebackground=SURFACE,
                              activeforeground=FG, relief="flat", font=f,
@@ -361,7 +651,7 @@ class VaultManager(tk.Tk):
         self.sidebar.pack_propagate(False)
 
         tk.Label(self.sidebar, text="CATEGORIES", bg=SIDEBAR, fg=FG_MUTED,
-                 font=("Segoe UI", 8, "bold"), anchor="w",
+                 font=FONTS["ui8b"], anchor="w",
                  padx=16, pady=12).pack(fill="x")
 
         self.sidebar_frame = tk.Frame(self.sidebar, bg=SIDEBAR)
@@ -410,176 +700,301 @@ class VaultManager(tk.Tk):
         status = tk.Frame(self, bg=SIDEBAR, pady=7, padx=16)
         status.pack(fill="x")
         self.lbl_status = tk.Label(status, text="", bg=SIDEBAR, fg=FG_DIM,
-                                   font=("Segoe UI", 9))
+                                   font=FONTS["ui9"])
         self.lbl_status.pack(side="left")
         tk.Label(status,
                  text="Ctrl+N  Add    Enter  Edit    Del  Delete    F5  Refresh",
-                 bg=SIDEBAR, fg=FG_MUTED, font=("Segoe UI", 9)).pack(side="right")
+                 bg=SIDEBAR, fg=FG_MUTED, font=FONTS["ui9"]).pack(side="right")
+
+        self._ready = True
 
     # ── Sidebar ───────────────────────────────────────────────────────────────
     def _sidebar_btn(self, text, count, tag, active=False):
-        color = CATEGORY_COLORS.get(tag, CATEGORY_COLORS["Default"])
+        """Create the sidebar entry for *tag*, or restyle the existing one.
+        Returns its row Frame; refresh_sidebar packs the rows in order."""
         bg = SURFACE if active else SIDEBAR
         fg = FG if active else FG_DIM
+        accent_bg = ACCENT if active else SIDEBAR
+
+        widgets = self._sidebar_rows.get(tag)
+        if widgets:
+            row, accent, inner, label, count_lbl = widgets
+            row.configure(bg=bg)
+            accent.configure(bg=accent_bg)
+            inner.configure(bg=bg)
+            label.configure(text=text, bg=bg, fg=fg)
+            count_lbl.configure(text=str(count), bg=bg)
+            return row
 
         row = tk.Frame(self.sidebar_frame, bg=bg, cursor="hand2")
-        row.pack(fill="x")
 
         # Left accent bar for active
-        accent = tk.Frame(row, bg=ACCENT if active else SIDEBAR, width=3)
+        accent = tk.Frame(row, bg=accent_bg, width=3)
         accent.pack(side="left", fill="y")
 
         inner = tk.Frame(row, bg=bg, padx=12, pady=9)
         inner.pack(side="left", fill="x", expand=True)
 
-        tk.Label(inner, text=text, bg=bg, fg=fg,
-                 font=("Segoe UI", 10), anchor="w").pack(side="left")
-        tk.Label(inner, text=str(count), bg=bg, fg=FG_MUTED,
-                 font=("Segoe UI", 9)).pack(side="right")
+        label = tk.Label(inner, text=text, bg=bg, fg=fg,
+                         font=FONTS["ui10"], anchor="w")
+        label.pack(side="left")
+        count_lbl = tk.Label(inner, text=str(count), bg=bg, fg=FG_MUTED,
+                             font=FONTS["ui9"])
+        count_lbl.pack(side="right")
+        self._sidebar_rows[tag] = (row, accent, inner, label, count_lbl)
 
         def on_click(t=tag):
             if t == "__favs__":
-                self._favs_only = not self._favs_only
-                self._active_category = None
-            elif t is None:
-                self._active_category = None
-                self._favs_only = False
+                state = (None, not self._favs_only)
             else:
-                self._active_category = t
-                self._favs_only = False
+                state = (t, False)
+            # Re-clicking the active entry would re-run the same query
+            if state == (self._active_category, self._favs_only):
+                return
+            self._active_category, self._favs_only = state
             self.refresh_sidebar()
             self.refresh_table()
 
         for w in (row, inner, accent):
             w.bind("<Button-1>", lambda e, t=tag: on_click(t))
+        return row
 
     def refresh_sidebar(self):
-        for w in self.sidebar_frame.winfo_children():
-            w.destroy()
-
-        total, cats = fetch_categories()
-        favs_count = len(fetch_commands(favorites_only=True))
-
-        self._sidebar_btn("All commands", total, None,
-                          active=(self._active_category is None and not self._favs_only))
-        self._sidebar_btn("★  Favorites", favs_count, "__favs__",
-                          active=self._favs_only)
+        if not self._can_refresh():
+            return
+        if self._cats_cache is None:
+            self._cats_cache = fetch_categories()
+        total, favs_count, cats = self._cats_cache
+        self._total = total
+
+        # Existing entries are restyled in place; only categories that
+        # appeared or vanished create or destroy widgets.
+        order = [
+            self._sidebar_btn("All commands", total, None,
+                              active=(self._active_category is None and not self._favs_only)),
+            self._sidebar_btn("★  Favorites", favs_count, "__favs__",
+                              active=self._favs_only),
+        ]
 
         if cats:
-            tk.Frame(self.sidebar_frame, bg=BORDER, height=1).pack(fill="x", pady=6)
+            if self._sidebar_sep is None:
+                self._sidebar_sep = tk.Frame(self.sidebar_frame, bg=BORDER, height=1)
+            order.append(self._sidebar_sep)
 
         for row in cats:
             cat = row["category"]
-            icon = CATEGORY_ICONS.get(cat, CATEGORY_ICONS["Default"])
-            self._sidebar_btn(f"  {cat}", row["cnt"], cat,
-                              active=(self._active_category == cat and not self._favs_only))
+            order.append(self._sidebar_btn(f"  {cat}", row["cnt"], cat,
+                              active=(self._active_category == cat and not self._favs_only)))
+
+        live = {None, "__favs__", *(row["category"] for row in cats)}
+        for tag in [t for t in self._sidebar_rows if t not in live]:
+            self._sidebar_rows.pop(tag)[0].destroy()
+
+        # Re-pack only when the set or order of entries changed
+        if order != self._sidebar_order:
+            for w in self._sidebar_order:
+                if w.winfo_exists():
+                    w.pack_forget()
+            for w in order:
+                w.pack(fill="x", pady=6 if w is self._sidebar_sep else 0)
+            self._sidebar_order = order
 
     # ── Table ─────────────────────────────────────────────────────────────────
-    def refresh_table(self, *_):
-        search = self.v_search.get()
-        rows = fetch_commands(
-            search=search,
+    def _on_search_change(self, *_):
+        # Coalesce a burst of keystrokes into one query for the final text
+        if self._search_after:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(SEARCH_DEBOUNCE_MS, self._debounced_refresh)
+
+    def _debounced_refresh(self):
+        self._search_after = None
+        self.refresh_table()
+
+    def refresh_table(self, *_, select=None):
+        """Queue a table query; _apply_rows fills the table when it returns.
+        *select* is an id to select once the rows are shown."""
+        if self._search_after:
+            self.after_cancel(self._search_after)
+            self._search_after = None
+        if not self._can_refresh():
+            return
+        self._read_seq += 1
+        self._reads.put((self._read_seq, select, dict(
+            search=self.v_search.get(),
             category=self._active_category,
             favorites_only=self._favs_only,
-        )
-
-        sel_id = self._selected_id()
-        self.tree.delete(*self.tree.get_children())
-
-        for i, r in enumerate(rows):
-            fav  = "★" if r["is_favorite"] else ""
-            tags = ("fav",) if r["is_favorite"] else ("even",) if i % 2 == 0 else ()
-            self.tree.insert("", "end", iid=str(r["id"]),
-                values=(fav, r["category"], r["subcategory"] or "",
-                        r["title"],
-                        r["command"].replace("\n", " ↵ "),
-                        r["description"] or "",
-                        r["tags"] or ""),
-                tags=tags)
-
-        # Restore selection
-        if sel_id:
+            sort=self._sort_col,
+            descending=self._sort_rev,
+        )))
+        if self._poll_after is None:
+            self._poll_after = self.after(READ_POLL_MS, self._poll_results)
+
+    def _reader_loop(self):
+        con = None
+        while True:
+            seq, select, query = self._reads.get()
+            if seq != self._read_seq:
+                continue  # a newer refresh is already queued
+            try:
+                if con is None:
+                    con = _connect()
+                rows = fetch_commands(con=con, **query)
+            except sqlite3.Error:
+                rows = None  # leave the table as it is
+            self._results.put((seq, select, rows))
+
+    def _poll_results(self):
+        self._poll_after = None
+        latest = None
+        while True:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            self._done_seq = latest[0]
+            if latest[2] is not None:
+                self._apply_rows(*latest)
+        if self._done_seq != self._read_seq:
+            self._poll_after = self.after(READ_POLL_MS, self._poll_results)
+
+    def _apply_rows(self, seq, select, rows):
+        if seq != self._read_seq:
+            return
+        sel_id = select or self._selected_id()
+        # Build every row up front so the loop below only makes Tk calls
+        items = [
+            (str(r["id"]),
+             ("★" if r["is_favorite"] else "", r["category"], r["subcategory"] or "",
+              r["title"], r["command_flat"], r["description"] or "", r["tags"] or ""),
+             TAG_FAV if r["is_favorite"] else TAG_EVEN if i % 2 == 0 else TAG_NONE)
+            for i, r in enumerate(rows)
+        ]
+        # Items outside this result set are detached, not deleted, so
+        # narrowing and widening a search only touches rows that changed.
+        cache = self._row_cache
+        # Unhook the scrollbars while items change so they aren't recomputed
+        # per insert; they catch up once the callbacks are restored.
+        tree = self.tree
+        yscroll, xscroll = tree.cget("yscrollcommand"), tree.cget("xscrollcommand")
+        tree.configure(yscrollcommand="", xscrollcommand="")
+        try:
+            for iid, values, tags in items:
+                cached = cache.get(iid)
+                if cached is None:
+                    tree.insert("", "end", iid=iid, values=values, tags=tags)
+                elif cached != (values, tags):
+                    tree.item(iid, values=values, tags=tags)
+                cache[iid] = (values, tags)
+            shown = [iid for iid, _, _ in items]
+            tree.set_children("", *shown)
+        finally:
+            tree.configure(yscrollcommand=yscroll, xscrollcommand=xscroll)
+
+        # Restore selection; a row that was filtered out stays unselected
+        if sel_id and str(sel_id) in shown:
             try:
                 self.tree.selection_set(str(sel_id))
                 self.tree.see(str(sel_id))
             except tk.TclError:
                 pass
+        else:
+            self.tree.selection_remove(self.tree.selection())
 
-        total_all = fetch_commands()
         cat_label = f"  ›  {self._active_category}" if self._active_category else ("  ›  Favorites" if self._favs_only else "")
         self.lbl_status.config(
-            text=f"{len(rows)} shown{cat_label}   /   {len(total_all)} total"
+            text=f"{len(rows)} shown{cat_label}   /   {self._total} total"
         )
 
-    def full_refresh(self):
+    def full_refresh(self, select=None):
+        # Called after every edit, so this is where cached counts go stale
+        self._cats_cache = None
         self.refresh_sidebar()
-        self.refresh_table()
+        self.refresh_table(select=select)
 
     def _selected_id(self):
         sel = self.tree.selection()
         return int(sel[0]) if sel else None
 
     def _sort(self, col):
-        rows = [(self.tree.set(k, col), k) for k in self.tree.get_children("")]
+        # Re-query in the new order; refresh_table just reorders existing items
         rev = (self._sort_col == col) and not self._sort_rev
-        rows.sort(reverse=rev)
-        for idx, (_, k) in enumerate(rows):
-            self.tree.move(k, "", idx)
         self._sort_col = col
         self._sort_rev = rev
+        self.refresh_table()
 
     # ── Actions ───────────────────────────────────────────────────────────────
+    def _command_dialog(self):
+        if self._cmd_dlg is None:
+            self._cmd_dlg = CommandDialog(self)
+        return self._cmd_dlg
+
+    def _try_save(self, write, d):
+        """Run *write*(d); on a duplicate, warn over the still-open form."""
+        try:
+            write(d)
+        except sqlite3.IntegrityError:
+            self._warn_duplicate(d, parent=self._cmd_dlg)
+            return False
+        return True
+
     def cmd_add(self):
-        dlg = CommandDialog(self, "Add Command",
-                            prefill_category=self._active_category)
-        if dlg.result:
-            insert_cmd(dlg.result)
+        result = self._command_dialog().open(
+            "Add Command", prefill_category=self._active_category,
+            save=lambda d: self._try_save(insert_cmd, d))
+        if result:
             self.full_refresh()
-            Toast(self, f"Added: {dlg.result['title']}", GREEN)
+            Toast(self, f"Added: {result['title']}", GREEN)
 
     def cmd_edit(self):
         cmd_id = self._selected_id()
         if not cmd_id:
             return
-        with _db() as con:
-            row = con.execute("SELECT * FROM commands WHERE id=?", (cmd_id,)).fetchone()
+        row = _db().execute(_SQL_GET, (cmd_id,)).fetchone()
         if not row:
             return
-        dlg = CommandDialog(self, "Edit Command", dict(row))
-        if dlg.result:
-            update_cmd(cmd_id, dlg.result)
+        def save(d):
+            return not _changed(row, d) or self._try_save(
+                lambda d: update_cmd(cmd_id, d), d)
+
+        result = self._command_dialog().open("Edit Command", dict(row), save=save)
+        if result and _changed(row, result):
             self.full_refresh()
-            Toast(self, f"Saved: {dlg.result['title']}", ACCENT)
+            Toast(self, f"Saved: {result['title']}", ACCENT)
 
     def cmd_duplicate(self):
         cmd_id = self._selected_id()
         if not cmd_id:
             return
-        with _db() as con:
-            row = dict(con.execute("SELECT * FROM commands WHERE id=?", (cmd_id,)).fetchone())
+        row = dict(_db().execute(_SQL_GET, (cmd_id,)).fetchone())
         row["title"] += " (copy)"
         row["is_favorite"] = 0
-        new_id = insert_cmd(row)
-        self.full_refresh()
         try:
-            self.tree.selection_set(str(new_id))
-            self.tree.see(str(new_id))
-        except tk.TclError:
-            pass
+            new_id = insert_cmd(row)
+        except sqlite3.IntegrityError:
+            self._warn_duplicate(row)
+            return
+        self.full_refresh(select=new_id)
         Toast(self, "Duplicated", PEACH)
 
+    def _warn_duplicate(self, d, parent=None):
+        where = " › ".join(p for p in (d["category"], d["subcategory"]) if p)
+        messagebox.showwarning("Duplicate command",
+            f"\"{d['title']}\" already exists in {where}.", parent=parent or self)
+
     def cmd_delete(self):
         cmd_id = self._selected_id()
         if not cmd_id:
             return
-        with _db() as con:
-            row = con.execute("SELECT title FROM commands WHERE id=?", (cmd_id,)).fetchone()
+        row = _db().execute(_SQL_GET_TITLE, (cmd_id,)).fetchone()
         if not row:
             return
         if messagebox.askyesno("Delete command",
                 f"Delete \"{row['title']}\"?\n\nThis cannot be undone.",
                 parent=self, icon="warning"):
             delete_cmd(cmd_id)
+            if self._row_cache.pop(str(cmd_id), None):
+                self.tree.delete(str(cmd_id))
             self.full_refresh()
             Toast(self, "Deleted", RED)
 
@@ -588,12 +1003,7 @@ class VaultManager(tk.Tk):
         if not cmd_id:
             return
         toggle_fav(cmd_id)
-        self.full_refresh()
-        try:
-            self.tree.selection_set(str(cmd_id))
-            self.tree.see(str(cmd_id))
-        except tk.TclError:
-            pass
+        self.full_refresh(select=cmd_id)
 
     # ── Import / Export ───────────────────────────────────────────────────────
     def cmd_export(self):
@@ -605,18 +1015,14 @@ class VaultManager(tk.Tk):
         )
         if not path:
             return
-        rows = fetch_commands(
+        rows = query_commands(
             search=self.v_search.get(),
             category=self._active_category,
             favorites_only=self._favs_only,
         )
-        data = [
-            {k: row[k] for k in ("category","subcategory","title","command","description","tags","is_favorite")}
-            for row in rows
-        ]
         with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        Toast(self, f"Exported {len(data)} commands", GREEN)
+            count = write_export(f, rows)
+        Toast(self, f"Exported {count} commands", GREEN)
 
     def cmd_import(self):
         path = filedialog.askopenfilename(
@@ -634,21 +1040,11 @@ class VaultManager(tk.Tk):
             messagebox.showerror("Import failed", str(e), parent=self)
             return
 
-        count = 0
-        for entry in data:
-            try:
-                insert_cmd({
-                    "category":    entry.get("category", "Imported"),
-                    "subcategory": entry.get("subcategory", ""),
-                    "title":       entry.get("title", "Untitled"),
-                    "command":     entry.get("command", ""),
-                    "description": entry.get("description", ""),
-                    "tags":        entry.get("tags", ""),
-                    "is_favorite": entry.get("is_favorite", 0),
-                })
-                count += 1
-            except Exception:
-                pass
+        try:
+            count = import_cmds(data)
+        except sqlite3.Error as e:
+            messagebox.showerror("Import failed", str(e), parent=self)
+            return
 
         self.full_refresh()
         Toast(self, f"Imported {count} commands", GREEN)
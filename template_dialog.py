@@ -1,19 +1,23 @@
 """
-template_dialog.py — standalone template variable prompt
-Called by main.py as a subprocess.
+template_dialog.py — template variable prompt
+main.py imports this module and calls run() in-process. It can also be run
+on its own for testing:
 
-Usage:
-    python template_dialog.py <command_json>
+    python template_dialog.py <command> [title]
 
-Reads JSON from argv[1]: {"command": "...", "title": "..."}
 Prints filled command to stdout, or exits with code 1 on cancel.
 """
 
-import json
+import functools
 import re
 import sys
-import tkinter as tk
-from tkinter import font as tkfont
+from typing import TYPE_CHECKING
+
+# tkinter is imported inside run(), after the no-variables early return, so
+# commands without placeholders never pay for loading Tk.
+if TYPE_CHECKING:
+    import tkinter as tk
+    from tkinter import font as tkfont
 
 # ── Palette (matches manager.py) ──────────────────────────────────────────────
 BG      = "#1E1E2E"
@@ -27,40 +31,87 @@ GREEN   = "#A6E3A1"
 RED     = "#F38BA8"
 BORDER  = "#313244"
 
+# Created as named fonts once per dialog in run() and shared by its widgets
+FONT_SPECS = {
+    "ui8":     ("Segoe UI", 8, "normal"),
+    "ui8b":    ("Segoe UI", 8, "bold"),
+    "ui9":     ("Segoe UI", 9, "normal"),
+    "ui10":    ("Segoe UI", 10, "normal"),
+    "ui10b":   ("Segoe UI", 10, "bold"),
+    "ui12b":   ("Segoe UI", 12, "bold"),
+    "mono10":  ("Consolas", 10, "normal"),
+    "mono10b": ("Consolas", 10, "bold"),
+    "mono11":  ("Consolas", 11, "normal"),
+}
+
 VAR_PATTERN = re.compile(r"\{([a-zA-Z0-9_]+)\}")
 
 
-def highlight_command(text_widget: tk.Text, command: str):
-    """Insert command text with {variables} highlighted in yellow."""
-    text_widget.config(state="normal")
-    text_widget.delete("1.0", "end")
+@functools.lru_cache(maxsize=64)
+def parse_template(command: str):
+    """Split command into ("plain", text) / ("var", name) segments.
 
+    Returns (segments, vars_found); vars_found lists each variable name in
+    order of first appearance. Cached, so a template that is used again is
+    not re-scanned.
+    """
+    segments = []
+    vars_found = []
+    seen = set()
     last = 0
     for m in VAR_PATTERN.finditer(command):
         if m.start() > last:
-            text_widget.insert("end", command[last:m.start()], "plain")
-        text_widget.insert("end", m.group(0), "var")
+            segments.append(("plain", command[last:m.start()]))
+        name = m.group(1)
+        segments.append(("var", name))
+        if name not in seen:
+            seen.add(name)
+            vars_found.append(name)
         last = m.end()
     if last < len(command):
-        text_widget.insert("end", command[last:], "plain")
-
-    text_widget.config(state="disabled")
+        segments.append(("plain", command[last:]))
+    return tuple(segments), tuple(vars_found)
+
+
+def render_segments(text_widget: "tk.Text", segments, entries):
+    """Show the command with current values, {variables} highlighted in yellow."""
+    parts = []
+    var_ranges = []
+    pos = 0
+    for kind, text in segments:
+        if kind == "var":
+            # Empty fields keep their {placeholder}
+            text = entries[text].get() or "{" + text + "}"
+            var_ranges.append((pos, pos + len(text)))
+        parts.append(text)
+        pos += len(text)
+
+    # One insert for the whole line, then tag the variable spans
+    text_widget.delete("1.0", "end")
+    text_widget.insert("1.0", "".join(parts))
+    for start, end in var_ranges:
+        text_widget.tag_add("var", f"1.0+{start}c", f"1.0+{end}c")
 
 
 def run(command: str, title: str) -> str | None:
     """Show dialog, return filled command or None on cancel."""
-    vars_found = list(dict.fromkeys(VAR_PATTERN.findall(command)))
+    # The template never changes, so it is scanned for variables only once
+    segments, vars_found = parse_template(command)
     if not vars_found:
         return command
 
+    import tkinter as tk
+    from tkinter import font as tkfont
+
     root = tk.Tk()
     root.title("Command Vault — Template")
     root.configure(bg=BG)
     root.resizable(False, False)
     root.attributes("-topmost", True)
+    fonts = {name: tkfont.Font(root, family=family, size=size, weight=weight)
+             for name, (family, size, weight) in FONT_SPECS.items()}
 
-    # Center on screen
-    root.update_idletasks()
+    # Center on screen; the size is fixed up front, no layout pass needed
     w, h = 560, 160 + len(vars_found) * 72
     sw = root.winfo_screenwidth()
     sh = root.winfo_screenheight()
@@ -72,59 +123,86 @@ def run(command: str, title: str) -> str | None:
     header = tk.Frame(root, bg=SURFACE, padx=20, pady=12)
     header.pack(fill="x")
     tk.Label(header, text="✎  Fill in template variables",
-             bg=SURFACE, fg=FG, font=("Segoe UI", 12, "bold")).pack(side="left")
+             bg=SURFACE, fg=FG, font=fonts["ui12b"]).pack(side="left")
     tk.Label(header, text=title, bg=SURFACE, fg=FG_DIM,
-             font=("Segoe UI", 9)).pack(side="right", padx=(0, 4))
+             font=fonts["ui9"]).pack(side="right", padx=(0, 4))
 
     # ── Command preview ───────────────────────────────────────────────────────
     preview_frame = tk.Frame(root, bg=BG, padx=20, pady=10)
     preview_frame.pack(fill="x")
     tk.Label(preview_frame, text="Command", bg=BG, fg=FG_DIM,
-             font=("Segoe UI", 8, "bold"), anchor="w").pack(fill="x")
+             font=fonts["ui8b"], anchor="w").pack(fill="x")
 
     preview = tk.Text(preview_frame, height=2, bg=SURFACE, fg=FG,
-                      font=("Consolas", 10), relief="flat", wrap="word",
-                      padx=10, pady=8, state="disabled",
+                      font=fonts["mono10"], relief="flat", wrap="word",
+                      padx=10, pady=8, takefocus=0,
                       highlightthickness=1, highlightbackground=BORDER)
-    preview.tag_configure("plain", foreground=FG)
-    preview.tag_configure("var",   foreground=YELLOW, font=("Consolas", 10, "bold"))
+    preview.tag_configure("var",   foreground=YELLOW, font=fonts["mono10b"])
     preview.pack(fill="x")
-    highlight_command(preview, command)
+
+    # The preview stays in the normal state, so redraws don't have to toggle
+    # it; key bindings keep it read-only instead. Ctrl+C / Ctrl+A and the
+    # dialog's Enter / Esc still get through. A click still focuses it, so
+    # Tab / Shift-Tab move focus on instead of being swallowed.
+    def block_edit(e):
+        if e.keysym in ("Tab", "ISO_Left_Tab"):
+            # Shift-Tab is ISO_Left_Tab on X11, Tab + Shift on Windows
+            back = e.keysym == "ISO_Left_Tab" or e.state & 0x1
+            target = e.widget.tk_focusPrev() if back else e.widget.tk_focusNext()
+            if target is not None:
+                target.focus_set()
+            return "break"
+        if e.keysym in ("Return", "KP_Enter", "Escape"):
+            return None
+        if e.state & 0x4 and e.keysym.lower() in ("c", "a", "slash"):
+            return None
+        return "break"
+    preview.bind("<Key>", block_edit)
+    preview.bind("<<PasteSelection>>", lambda _: "break")
 
     # ── Variable inputs ───────────────────────────────────────────────────────
     vars_frame = tk.Frame(root, bg=BG, padx=20, pady=4)
     vars_frame.pack(fill="x")
     entries: dict[str, tk.StringVar] = {}
 
-    for i, var in enumerate(vars_found):
-        row = tk.Frame(vars_frame, bg=BG)
-        row.pack(fill="x", pady=6)
+    # Keystrokes and pastes only schedule a redraw; the preview is rebuilt
+    # once per idle cycle however many writes came in.
+    redraw = {"job": None}
+
+    def do_redraw():
+        redraw["job"] = None
+        render_segments(preview, segments, entries)
+
+    # Shared by every entry's StringVar
+    def on_type(*_):
+        if redraw["job"] is None:
+            redraw["job"] = root.after_idle(do_redraw)
 
-        tk.Label(row, text=f"{var}", bg=BG, fg=ACCENT,
-                 font=("Consolas", 10, "bold"), width=18, anchor="w").pack(side="left")
+    # Labels and entries share one grid instead of a packed frame per row
+    vars_frame.grid_columnconfigure(1, weight=1)
+    for i, var in enumerate(vars_found):
+        tk.Label(vars_frame, text=f"{var}", bg=BG, fg=ACCENT,
+                 font=fonts["mono10b"], width=18, anchor="w"
+                 ).grid(row=i, column=0, sticky="w", pady=6)
 
         sv = tk.StringVar()
         entries[var] = sv
-        e = tk.Entry(row, textvariable=sv, bg=SURFACE, fg=FG,
+        e = tk.Entry(vars_frame, textvariable=sv, bg=SURFACE, fg=FG,
                      insertbackground=FG, relief="flat",
-                     font=("Consolas", 11),
+                     font=fonts["mono11"],
                      highlightthickness=1, highlightbackground=BORDER,
                      highlightcolor=ACCENT)
-        e.pack(side="left", fill="x", expand=True, ipady=7, padx=(8, 0))
+        e.grid(row=i, column=1, sticky="ew", ipady=7, padx=(8, 0), pady=6)
 
         # Focus first field
         if i == 0:
             e.focus_set()
 
         # Update preview on type
-        def on_type(*_, v=var, sv=sv):
-            filled = command
-            for k, s in entries.items():
-                val = s.get() or f"{{{k}}}"
-                filled = filled.replace(f"{{{k}}}", val)
-            highlight_command(preview, filled)
         sv.trace_add("write", on_type)
 
+    render_segments(preview, segments, entries)
+
     # ── Buttons ───────────────────────────────────────────────────────────────
     btn_row = tk.Frame(root, bg=SURFACE, padx=20, pady=12)
     btn_row.pack(fill="x", side="bottom")
@@ -134,24 +212,25 @@ def run(command: str, title: str) -> str | None:
         root.destroy()
 
     def on_ok():
-        filled = command
-        for var, sv in entries.items():
-            filled = filled.replace(f"{{{var}}}", sv.get())
-        result["value"] = filled
+        # One join over the parsed segments, filled exactly as the preview
+        # shows them: an empty field keeps its {placeholder}
+        result["value"] = "".join(
+            (entries[text].get() or "{" + text + "}") if kind == "var" else text
+            for kind, text in segments)
         root.destroy()
 
     tk.Button(btn_row, text="Cancel", command=on_cancel,
               bg=SURFACE2, fg=FG_DIM, activebackground=BORDER,
-              relief="flat", font=("Segoe UI", 10),
+              relief="flat", font=fonts["ui10"],
               padx=18, pady=7, cursor="hand2", bd=0).pack(side="right", padx=(6,0))
 
     tk.Button(btn_row, text="Copy Command", command=on_ok,
               bg=ACCENT, fg="#1E1E2E", activebackground="#6BA3F5",
-              relief="flat", font=("Segoe UI", 10, "bold"),
+              relief="flat", font=fonts["ui10b"],
               padx=22, pady=7, cursor="hand2", bd=0).pack(side="right")
 
     tk.Label(btn_row, text="Enter to confirm  ·  Esc to cancel",
-             bg=SURFACE, fg=FG_DIM, font=("Segoe UI", 8)).pack(side="left")
+             bg=SURFACE, fg=FG_DIM, font=fonts["ui8"]).pack(side="left")
 
     root.bind("<Return>", lambda _: on_ok())
     root.bind("<Escape>", lambda _: on_cancel())
@@ -165,12 +244,8 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         sys.exit(1)
 
-    try:
-        payload = json.loads(sys.argv[1])
-        command = payload["command"]
-        title   = payload.get("title", "")
-    except (json.JSONDecodeError, KeyError):
-        sys.exit(1)
+    command = sys.argv[1]
+    title   = sys.argv[2] if len(sys.argv) > 2 else ""
 
     filled = run(command, title)
     if filled is None:
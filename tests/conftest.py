@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db_init  # noqa: E402
+
+# Left in place of the modules' shared connections after each test, so their
+# atexit handlers (PRAGMA optimize) fail quietly instead of opening the
+# plugin's real vault.db.
+_CLOSED = sqlite3.connect(":memory:")
+_CLOSED.close()
+
+
+@pytest.fixture
+def vault_path(tmp_path):
+    """A freshly seeded vault in a temp directory."""
+    path = str(tmp_path / "vault.db")
+    db_init.seed_db(path)
+    return path
+
+
+@pytest.fixture
+def plugin(vault_path, monkeypatch):
+    """main.py pointed at the temp vault with empty caches."""
+    import main
+
+    monkeypatch.setattr(main, "DB_PATH", vault_path)
+    monkeypatch.setattr(main, "_CONN", None)
+    monkeypatch.setattr(main, "_DB_READY", False)
+    monkeypatch.setattr(main, "_DATA_VERSION", None)
+    main._invalidate_caches()
+    yield main
+    if main._CONN is not None:
+        main._CONN.close()
+    main._invalidate_caches()
+    monkeypatch.undo()
+    main._CONN = _CLOSED
+
+
+@pytest.fixture
+def manager(vault_path, monkeypatch):
+    """manager.py pointed at the temp vault."""
+    import manager
+
+    monkeypatch.setattr(manager, "DB_PATH", vault_path)
+    monkeypatch.setattr(manager, "_CON", None)
+    yield manager
+    if manager._CON is not None:
+        manager._CON.close()
+    monkeypatch.undo()
+    manager._CON = _CLOSED
@@ -0,0 +1,76 @@
+import sqlite3
+
+import db_init
+
+
+def _count(path, where="1"):
+    con = sqlite3.connect(path)
+    try:
+        return con.execute(f"SELECT COUNT(*) FROM commands WHERE {where}").fetchone()[0]
+    finally:
+        con.close()
+
+
+def test_seed_db_is_idempotent(vault_path):
+    seeded = _count(vault_path)
+    assert seeded > 0
+    db_init.seed_db(vault_path)
+    db_init.seed_db(vault_path)
+    assert _count(vault_path) == seeded
+
+
+def test_seed_db_stamps_schema_version(vault_path):
+    con = sqlite3.connect(vault_path)
+    try:
+        assert con.execute("PRAGMA user_version").fetchone()[0] == db_init.SCHEMA_VERSION
+        assert con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        con.close()
+
+
+def test_null_and_empty_subcategory_share_natural_key(vault_path):
+    con = sqlite3.connect(vault_path)
+    con.execute(
+        "INSERT INTO commands(category, subcategory, title, command) VALUES ('X', NULL, 't', 'c')")
+    con.commit()
+    for sub in (None, ""):
+        cur = con.execute(
+            "INSERT OR IGNORE INTO commands(category, subcategory, title, command) "
+            "VALUES ('X', ?, 't', 'c')", (sub,))
+        assert cur.rowcount == 0
+    con.close()
+
+
+def test_reseed_without_natkey_does_not_duplicate(vault_path, monkeypatch):
+    # A legacy vault that already holds a duplicate row can't build the
+    # unique index; re-seeding must still skip rows that exist.
+    con = sqlite3.connect(vault_path)
+    con.execute("DROP INDEX ux_cmd_natkey")
+    con.execute(
+        "INSERT INTO commands(category, subcategory, title, command) "
+        "SELECT category, subcategory, title, command FROM commands LIMIT 1")
+    con.commit()
+    con.close()
+    before = _count(vault_path)
+
+    seed = {"Y": {"": [["No sub", "echo 1", "", "", 0]]}}
+    monkeypatch.setattr(db_init, "load_seed", lambda: seed)
+    db_init.seed_db(vault_path)
+    db_init.seed_db(vault_path)
+    assert _count(vault_path) == before + 1
+    assert _count(vault_path, "category = 'Y' AND subcategory IS NULL") == 1
+
+
+def test_migrate_adds_fts_to_legacy_vault(vault_path):
+    con = sqlite3.connect(vault_path, isolation_level=None)
+    for name in ("commands_ai", "commands_ad", "commands_au"):
+        con.execute(f"DROP TRIGGER {name}")
+    con.execute("DROP TABLE commands_fts")
+    con.execute("PRAGMA user_version=0")
+
+    db_init.migrate(con)
+    assert con.execute("PRAGMA user_version").fetchone()[0] == db_init.SCHEMA_VERSION
+    hits = con.execute(
+        "SELECT COUNT(*) FROM commands_fts WHERE commands_fts MATCH 'vlan'").fetchone()[0]
+    assert hits > 0
+    con.close()
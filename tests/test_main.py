@@ -0,0 +1,88 @@
+import itertools
+
+import pytest
+
+import main
+
+# The split()-based parser _TOKEN_RE replaced, kept as the reference.
+_OPERATORS = {
+    "cat": "category", "c": "category", "category": "category",
+    "sub": "subcategory", "s": "subcategory", "subcategory": "subcategory",
+    "tag": "tag", "t": "tag",
+    "fav": "favorites", "f": "favorites", "favorite": "favorites", "favorites": "favorites",
+}
+
+
+def _old_parse_query(raw):
+    filters = {}
+    plain_tokens = []
+    for token in raw.split():
+        if ":" in token:
+            key, _, val = token.partition(":")
+            op = _OPERATORS.get(key.lower().strip())
+            val = val.strip()
+            if op == "favorites":
+                filters["favorites"] = True
+            elif op and val:
+                filters[op] = val
+            else:
+                plain_tokens.append(token)
+        else:
+            plain_tokens.append(token)
+    return " ".join(plain_tokens), filters
+
+
+_WORDS = ["vlan", "cat:cisco", "CAT:Linux", "c:x", "sub:vlan", "s:", "tag:ccna",
+          "t:a:b", "fav:", "F:", "favorites:yes", "favourite:x", "xcat:foo",
+          "cat:", "http://host", ":", "show", "mac"]
+
+
+@pytest.mark.parametrize("raw", [
+    "", "   ", "cat:cisco vlan", "fav: show mac", "tag:ccna sub:vlan",
+    "cat:a cat:b", "  show\tmac  ", "cat: vlan",
+])
+def test_parse_query_examples_match_old_parser(raw):
+    assert main._parse_query(raw) == _old_parse_query(raw)
+
+
+def test_parse_query_matches_old_parser_on_combinations():
+    for combo in itertools.permutations(_WORDS, 3):
+        raw = " ".join(combo)
+        assert main._parse_query(raw) == _old_parse_query(raw), raw
+
+
+def test_like_patterns_escape_wildcards():
+    assert main._like_prefix("a%b_c") == "a\\%b\\_c%"
+    assert main._like_prefix("*sco") == "%sco%"
+    assert "100\\%".translate(main.LIKE_ESCAPE) == "100\\\\\\%"
+
+
+def test_build_fts_q_drops_punctuation_only_words():
+    assert main._build_fts_q("-") == ""
+    assert main._build_fts_q('show "mac') == '"show"* OR "mac"*'
+
+
+def test_percent_and_underscore_match_literally(plugin):
+    rows = plugin._search("_")
+    assert rows
+    assert all(any("_" in (v or "") for v in row[1:] if isinstance(v, str))
+               for row in rows)
+    assert len(plugin._search("%")) < len(plugin._search(""))
+
+
+def test_word_fragment_falls_back_to_like(plugin):
+    # FTS prefix tokens can't match inside a word; LIKE still does
+    assert plugin._search("lan")
+    assert plugin._search("-")
+
+
+def test_get_row_sees_writes_from_other_connections(plugin):
+    import sqlite3
+
+    cmd_id = plugin._search("vlan")[0][0]
+    assert plugin._get_row(cmd_id)[5] != "changed"
+    con = sqlite3.connect(plugin.DB_PATH)
+    con.execute("UPDATE commands SET command='changed' WHERE id=?", (cmd_id,))
+    con.commit()
+    con.close()
+    assert plugin._get_row(cmd_id)[5] == "changed"
@@ -0,0 +1,41 @@
+import io
+import json
+
+
+def test_import_cmds_skips_duplicates(manager):
+    entry = {"category": "X", "subcategory": None, "title": "t", "command": "c"}
+    assert manager.import_cmds([entry]) == 1
+    assert manager.import_cmds([entry]) == 0
+    assert manager.import_cmds([dict(entry, subcategory="")]) == 0
+    assert manager.import_cmds([dict(entry, title="other")]) == 1
+
+
+def test_import_cmds_skips_malformed_entries(manager):
+    entries = ["nope", {"category": ["X"], "title": "t", "command": "c"},
+               {"category": "X", "title": "ok", "command": "c"}]
+    assert manager.import_cmds(entries) == 1
+
+
+def test_like_fallback_escapes_wildcards(manager, monkeypatch):
+    manager._db()
+    monkeypatch.setattr(manager, "_HAS_FTS", False)
+    total = len(manager.fetch_commands())
+    assert 0 < len(manager.fetch_commands(search="_")) < total
+    for row in manager.fetch_commands(search="%"):
+        assert "%" in "".join(row[k] or "" for k in ("title", "command", "description", "tags"))
+
+
+def test_write_export_matches_json_dump(manager):
+    rows = manager.fetch_commands()
+    expected = json.dumps(
+        [{k: row[k] for k in manager.EXPORT_FIELDS} for row in rows],
+        indent=2, ensure_ascii=False)
+    f = io.StringIO()
+    assert manager.write_export(f, manager.query_commands()) == len(rows)
+    assert f.getvalue() == expected
+
+
+def test_write_export_empty(manager):
+    f = io.StringIO()
+    assert manager.write_export(f, []) == 0
+    assert f.getvalue() == json.dumps([], indent=2)